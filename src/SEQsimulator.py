@@ -23,3 +23,24 @@ def get_exact_read(DNA_seq:str, n:int):
     idx = random.randint(0,len(DNA_seq)-n)
     read = DNA_seq[idx:idx+n]
     return read
+
+
+def get_approx_read(DNA_seq:str, n:int, d:int):
+    """Simulates a read of length n from a DNA sequence with d random edits
+    (substitutions, deletions or insertions).
+    
+    Example:
+    get_approx_read('GCTGAATCTATTTATGGTGG',5,1)
+
+    """
+    read = list(get_exact_read(DNA_seq, n))
+    for _ in range(d):
+        mutation = random.randrange(3)
+        position = random.randrange(len(read))
+        if mutation == 0:
+            read[position] = random.choice('ACGT')
+        elif mutation == 1 and len(read) > 1:
+            del read[position]
+        else:
+            read.insert(position, random.choice('ACGT'))
+    return ''.join(read)
@@ -17,25 +17,22 @@ def get_edits(p: str, q: str):
     """
     assert len(p) == len(q)
 
-    edits = ''  # edits to go from p to q
-    for i in range(len(p)):
-        if p[i] != '-' and q[i] != '-':
-            edits += 'M'
-        if p[i] == '-' and q[i] != '-':
-            edits += 'I'
-        if p[i] != '-' and q[i] == '-':
-            edits += 'D'
+    # without gaps (e.g. exact matches) every column is a match.
+    if '-' not in p and '-' not in q:
+        return p, q, 'M' * len(p)
 
-    if len(p) == 0 and len(q) == 0:
-        p_out = ''
-        q_out = ''
-        edits = ''
-    else:
-        p_out = p.replace('-','')
-        q_out = q.replace('-','')
-        edits = edits
+    edits = []  # edits to go from p to q
+    for a, b in zip(p, q):
+        if a != '-' and b != '-':
+            edits.append('M')
+        elif a == '-' and b != '-':
+            edits.append('I')
+        elif a != '-' and b == '-':
+            edits.append('D')
 
-    return p_out, q_out , edits
+    p_out = p.replace('-','')
+    q_out = q.replace('-','')
+    return p_out, q_out, ''.join(edits)
 
 
 
@@ -131,3 +128,65 @@ def edit_dist(p: str, x: str, i: int, edits: str):
     
     return counts
 
+
+
+def banded_align(p: str, q: str, band: int):
+    """Global alignment of p and q with unit cost edits, only filling the
+    dynamic programming cells within band of the diagonal (widened so the
+    band reaches the bottom right corner).
+
+    Args:
+        p (str): The first sequence to align.
+        q (str): The second sequence to align
+        band (int): How far from the diagonal the alignment may go
+
+    Returns:
+        tuple[str, str]: The two rows in the pairwise alignment
+
+    >>> banded_align('ACGTTA', 'AGTTCA', 2)
+    ('ACGTT-A', 'A-GTTCA')
+
+    """
+    n, m = len(p), len(q)
+    lo = min(0, m - n) - band  # smallest j - i in the band.
+    width = max(0, m - n) + band - lo + 1
+    INF = n + m + 1
+    cost = [[INF] * width for _ in range(n + 1)]
+    for i in range(n + 1):
+        row = cost[i]
+        above = cost[i - 1] if i > 0 else None
+        for k in range(width):
+            j = i + lo + k
+            if j < 0 or j > m:
+                continue
+            if i == 0 and j == 0:
+                row[k] = 0
+                continue
+            c = INF
+            if i > 0 and j > 0:
+                c = above[k] + (p[i - 1] != q[j - 1])
+            if i > 0 and k + 1 < width and above[k + 1] + 1 < c:
+                c = above[k + 1] + 1  # p[i-1] against a gap.
+            if j > 0 and k > 0 and row[k - 1] + 1 < c:
+                c = row[k - 1] + 1  # q[j-1] against a gap.
+            row[k] = c
+
+    p_align, q_align = [], []
+    i, j = n, m
+    while i > 0 or j > 0:
+        k = j - i - lo
+        c = cost[i][k]
+        if i > 0 and j > 0 and c == cost[i - 1][k] + (p[i - 1] != q[j - 1]):
+            p_align.append(p[i - 1])
+            q_align.append(q[j - 1])
+            i -= 1
+            j -= 1
+        elif i > 0 and k + 1 < width and c == cost[i - 1][k + 1] + 1:
+            p_align.append(p[i - 1])
+            q_align.append('-')
+            i -= 1
+        else:
+            p_align.append('-')
+            q_align.append(q[j - 1])
+            j -= 1
+    return ''.join(reversed(p_align)), ''.join(reversed(q_align))
@@ -0,0 +1,90 @@
+"""Approximate matching (up to d edits) by backtracking in a suffix tree.
+
+The read is matched along every path from the root, branching at each
+step into a match/mismatch against the next reference letter, an
+insertion (a read letter not in the reference) and a deletion (a
+reference letter skipped). A branch is cut as soon as its edits exceed
+d, and when the whole read is consumed all leaves below the current
+position are hits. Edits use the SAM meaning of I and D.
+
+Many paths can reach the same leaf (3M, 2M1I and 1M1I1M all place 'iss'
+at the same position), and an indel near either end of the read shifts
+the same hit by a letter (3M at 2 and 1M1I1M at 3 both end at 5), so
+one alignment is kept per start and per end position: the one with the
+fewest edits, then the fewest indels. Alignments starting or
+ending with an insertion are never made: a mismatch against the
+reference letter before (after) the read costs at most as much, so they
+only add shifted copies of the same hit (reads hanging over the very
+start or end of the reference are not found).
+
+Works on a SuffixTreeIndex from st.py (Node() tree with leaf intervals).
+"""
+
+################################################################
+# libraries:
+from cigar import edits_to_cigar
+
+################################################################
+# Functions:
+
+def approx_search(index, read, d):
+    '''Returns the sorted (position, cigar, reference length) of the
+    positions where read matches with at most d edits, one minimum-edit
+    alignment per position.
+
+    Example:
+    index = SuffixTreeIndex('mississippi')
+    print(approx_search(index, 'ssx', 1))
+    #>>> [(2, '3M', 3), (5, '3M', 3)]
+    '''
+    if not read or index.tree == None:
+        return []
+    tree, ref, leaf_array = index.tree, index.ref, index.leaf_array
+    n = len(ref)
+    m = len(read)
+    best = {}  # position -> (edits, indels, cigar, reference length)
+    max_edits = d
+
+    def steps(node, j):
+        # the (letter, node, next j) that can follow position j on node's edge.
+        if node is not tree and j < (node.end if node.end < n else n):
+            yield ref[j], node, j + 1
+        elif node is tree or j == node.end:
+            for child in node.out.values():
+                if child.start < n:
+                    yield ref[child.start], child, child.start + 1
+
+    # frames (node, j, i, d, edits) of an explicit stack instead of one
+    # recursion level per read letter; edits is a linked list (op, previous
+    # edits), shared by the frames that extend it.
+    stack = [(tree, None, 0, d, None)]
+    while stack:
+        node, j, i, d, path = stack.pop()
+        last = path[0] if path else None
+        if i == m:
+            ops = []
+            while path:
+                ops.append(path[0])
+                path = path[1]
+            indels = ops.count('I') + ops.count('D')
+            hit = (max_edits - d, indels, edits_to_cigar(''.join(reversed(ops))), m - ops.count('I') + ops.count('D'))
+            for position in leaf_array[node.leaf_lo:node.leaf_hi]:
+                if position not in best or hit < best[position]:
+                    best[position] = hit
+            continue
+        for letter, child, next_j in steps(node, j):
+            cost = letter != read[i]
+            if cost <= d:
+                stack.append((child, next_j, i + 1, d - cost, ('M', path)))
+            # a deletion before the first read letter, or right after an
+            # insertion (a mismatch is cheaper), is never needed.
+            if d > 0 and i > 0 and last != 'I':
+                stack.append((child, next_j, i, d - 1, ('D', path)))
+        if d > 0 and last != 'D' and 0 < i < m - 1:
+            stack.append((node, j, i + 1, d - 1, ('I', path)))
+    by_end = {}
+    for position, (edits, indels, cigar, span) in best.items():
+        hit = (edits, indels, position, cigar, span)
+        if position + span not in by_end or hit < by_end[position + span]:
+            by_end[position + span] = hit
+    return sorted((position, cigar, span) for _, _, position, cigar, span in by_end.values())
@@ -0,0 +1,397 @@
+"""Benchmarks for st.
+
+Run one or more named benchmarks and write the results as JSON (a list of
+{"benchmark": ..., parameters..., "seconds": [...]} rows) for regression
+tracking. Timings use time.perf_counter with warmup runs discarded.
+
+The construction, search, leaves and end_to_end benchmarks sweep the
+reference lengths in --sizes (1 kb to 10 Mb by default) over the inputs
+in --inputs:
+
+    random    uniform random DNA (typical case)
+    repeat    'AAAA...' (worst case: every suffix is nested in the previous
+              one, the naive builder is quadratic and every read of A's
+              has n hits)
+    periodic  'ACGTTGCA' repeated (long repeats with a small alphabet)
+
+Once one run of a method takes more than --time-limit seconds on an input,
+its remaining runs at that size and all larger sizes are skipped, and so
+is a size where the growth of its time over the previous two sizes
+predicts it. Node() trees are only built up to --node-tree-limit letters
+as they take ~500 bytes per letter.
+
+Example:
+python3 benchmark.py threads --workers 1 2 4 -o threads.json
+python3 benchmark.py construction search --sizes 1000 10000 100000 -o st.json
+"""
+
+################################################################
+# libraries:
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+from SEQsimulator import simulate_string, get_exact_read, get_approx_read
+
+################################################################
+# Functions:
+
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    '''Register a benchmark under its function name (without bench_).'''
+    BENCHMARKS[function.__name__[len('bench_'):]] = function
+    return function
+
+
+def timed(function, repeat=3, warmup=1, limit=None):
+    '''Run function warmup + repeat times and return the repeat timings.
+    Once a run takes more than limit seconds the remaining runs are
+    skipped, and if that was a warmup run its timing is returned.'''
+    for _ in range(warmup):
+        start = time.perf_counter()
+        function()
+        if limit is not None and time.perf_counter() - start > limit:
+            return [time.perf_counter() - start]
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+        if limit is not None and seconds[-1] > limit:
+            break
+    return seconds
+
+
+def predicted(timings, length):
+    '''Seconds at length extrapolated from the last two (length, seconds)
+    of timings, assuming time grows as a power of the length.'''
+    (l1, t1), (l2, t2) = timings[-2:]
+    if t1 <= 0 or t2 <= 0 or l1 == l2:
+        return 0
+    return t2 * (length / l2) ** (math.log(t2 / t1) / math.log(l2 / l1))
+
+
+def simulate_reads(ref, n, m):
+    return [('read{}'.format(i), get_exact_read(ref, m), '') for i in range(n)]
+
+
+INPUTS = {
+    'random': simulate_string,
+    'repeat': lambda m: 'A' * m,
+    'periodic': lambda m: ('ACGTTGCA' * (m // 8 + 1))[:m],
+}
+
+
+def sweep(args, methods):
+    '''Yields (input kind, length, ref, name, method, too_slow) for every
+    input, size and method. Time with timed(..., limit=args.time_limit) and
+    report each timing with too_slow(name, kind, seconds): larger sizes are
+    skipped for a method once it was slower than args.time_limit, or when
+    its previous timings predict that it will be. Node() tree methods
+    (names starting with 'tree', 'naive' or 'mccreight') are skipped above
+    args.node_tree_limit.'''
+    slow = set()
+    timings = {}  # (name, kind) -> [(length, seconds)]
+
+    def too_slow(name, kind, seconds):
+        # called while the sweep is at the length that was timed.
+        timings.setdefault((name, kind), []).append((length, min(seconds)))
+        if min(seconds) > args.time_limit:
+            slow.add((name, kind))
+
+    for kind in args.inputs:
+        for length in sorted(args.sizes):
+            ref = INPUTS[kind](length)
+            for name, method in methods:
+                if (name, kind) in slow:
+                    continue
+                history = timings.get((name, kind), [])
+                if len(history) >= 2 and predicted(history, length) > args.time_limit:
+                    slow.add((name, kind))
+                    continue
+                if name.startswith(('tree', 'naive', 'mccreight')) and length > args.node_tree_limit:
+                    continue
+                yield kind, length, ref, name, method, too_slow
+
+
+def backends():
+    from st import build_index
+    return [('tree', lambda ref: build_index(ref, 'tree', 'mccreight')),
+            ('compact', lambda ref: build_index(ref, 'compact')),
+            ('sa', lambda ref: build_index(ref, 'sa')),
+            ('scan', lambda ref: build_index(ref, 'scan'))]
+
+
+@benchmark
+def bench_construction(args):
+    '''Index construction time per backend/builder, input kind and reference length.'''
+    from st import SuffixTree, SuffixTreeMcCreight
+    from compact_st import CompactSuffixTree
+    from sa import SuffixArray
+
+    methods = [('naive', SuffixTree), ('mccreight', SuffixTreeMcCreight),
+               ('compact', CompactSuffixTree), ('sa', SuffixArray)]
+    rows = []
+    for kind, length, ref, name, build, too_slow in sweep(args, methods):
+        seconds = timed(lambda: build(ref), args.repeat, args.warmup, args.time_limit)
+        too_slow(name, kind, seconds)
+        rows.append({'method': name, 'input': kind, 'ref_length': length, 'seconds': seconds,
+                     'ns_per_letter': min(seconds) / length * 1e9})
+    return rows
+
+
+@benchmark
+def bench_search(args):
+    '''Exact search time per read (including reporting the hits) per backend.'''
+    rows = []
+    for kind, length, ref, name, build, too_slow in sweep(args, backends()):
+        index = build(ref)
+        reads = [get_exact_read(ref, min(args.read_length, length - 1)) for _ in range(args.reads)]
+
+        def run():
+            for read in reads:
+                index.search(read)
+        seconds = timed(run, args.repeat, args.warmup, args.time_limit)
+        too_slow(name, kind, seconds)
+        rows.append({'method': name, 'input': kind, 'ref_length': length, 'reads': args.reads,
+                     'read_length': args.read_length, 'seconds': seconds,
+                     'us_per_read': min(seconds) / args.reads * 1e6})
+    return rows
+
+
+@benchmark
+def bench_leaves(args):
+    '''Reporting the hits below a search locus: bf_order, iter_leaves and leaf interval slices.'''
+    from st import SuffixTreeMcCreight, match_locus, bf_order, iter_leaves, leaf_intervals
+
+    def enumerate_bf_order(tree, leaf_array, node):
+        return [t[2] for t in bf_order(node) if t[2] != None]
+
+    def enumerate_iter_leaves(tree, leaf_array, node):
+        return list(iter_leaves(node))
+
+    def enumerate_intervals(tree, leaf_array, node):
+        return leaf_array[node.leaf_lo:node.leaf_hi]
+
+    methods = [('tree_bf_order', enumerate_bf_order), ('tree_iter_leaves', enumerate_iter_leaves),
+               ('tree_leaf_intervals', enumerate_intervals)]
+    rows = []
+    trees = {}
+    for kind, length, ref, name, report, too_slow in sweep(args, methods):
+        if (kind, length) not in trees:
+            tree = SuffixTreeMcCreight(ref)
+            reads = [get_exact_read(ref, min(args.read_length, length - 1)) for _ in range(args.reads)]
+            trees = {(kind, length): (tree, leaf_intervals(tree),
+                                      [match_locus(tree, ref, read)[0] for read in reads])}
+        tree, leaf_array, loci = trees[kind, length]
+        hits = sum(node.leaf_hi - node.leaf_lo for node in loci)
+
+        def run():
+            for node in loci:
+                report(tree, leaf_array, node)
+        seconds = timed(run, args.repeat, args.warmup, args.time_limit)
+        too_slow(name, kind, seconds)
+        rows.append({'method': name, 'input': kind, 'ref_length': length, 'reads': len(loci),
+                     'hits': hits, 'seconds': seconds, 'ns_per_hit': min(seconds) / max(hits, 1) * 1e9})
+    return rows
+
+
+@benchmark
+def bench_output(args):
+    '''Formatting and writing hits in each output format (sam.py).'''
+    from sam import FORMATS, FORMATTERS, SamWriter
+    from cigar import exact_cigar
+
+    ref = simulate_string(args.ref_length)
+    hits = [('read{}'.format(i), random.randrange(args.ref_length), get_exact_read(ref, args.read_length))
+            for i in range(args.reads)]
+    rows = []
+    with open(os.devnull, 'w') as devnull:
+        for fmt in FORMATS:
+            format_record = FORMATTERS[fmt]
+
+            def run():
+                writer = SamWriter(devnull, fmt)
+                for qname, position, seq in hits:
+                    writer.write(format_record(qname, 0, 0, 'chr1', position, exact_cigar(len(seq)), seq, ''))
+                writer.flush()
+            seconds = timed(run, args.repeat, args.warmup)
+            rows.append({'format': fmt, 'hits': args.reads, 'read_length': args.read_length,
+                         'seconds': seconds, 'us_per_hit': min(seconds) / args.reads * 1e6})
+    return rows
+
+
+@benchmark
+def bench_end_to_end(args):
+    '''Wall time of complete 'st genome.fa reads.fq' runs per backend.'''
+    st = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'st.py')
+    methods = [('tree', ['--backend', 'tree', '--builder', 'mccreight']),
+               ('compact', ['--backend', 'compact']), ('sa', ['--backend', 'sa']),
+               ('scan', ['--backend', 'scan'])]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, 'genome.fa')
+        fastq = os.path.join(tmp, 'reads.fq')
+        written = None
+        for kind, length, ref, name, options, too_slow in sweep(args, methods):
+            if written != (kind, length):
+                with open(fasta, 'w') as f:
+                    f.write('>chr1\n' + ref + '\n')
+                with open(fastq, 'w') as f:
+                    for read_name, read, _ in simulate_reads(ref, args.reads, min(args.read_length, length - 1)):
+                        f.write('@{}\n{}\n'.format(read_name, read))
+                written = (kind, length)
+            command = [sys.executable, st] + options + [fasta, fastq]
+            seconds = timed(lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True),
+                            args.repeat, args.warmup, args.time_limit)
+            too_slow(name, kind, seconds)
+            rows.append({'method': name, 'input': kind, 'ref_length': length, 'reads': args.reads,
+                         'read_length': args.read_length, 'seconds': seconds})
+    return rows
+
+
+@benchmark
+def bench_threads(args):
+    '''Mapping throughput of mapper.map_reads for different numbers of worker processes.'''
+    from st import build_index
+    from mapper import map_reads
+    from generalized import GeneralizedIndex
+
+    ref = simulate_string(args.ref_length)
+    reads = simulate_reads(ref, args.reads, args.read_length)
+    genome = GeneralizedIndex.build([['chr1', ref]], lambda text: build_index(text, 'tree', 'mccreight'))
+    rows = []
+    with open(os.devnull, 'w') as devnull:
+        for workers in args.workers:
+            seconds = timed(lambda: map_reads(genome, reads, devnull, threads=workers),
+                            args.repeat, args.warmup)
+            rows.append({'workers': workers, 'ref_length': args.ref_length, 'reads': args.reads,
+                         'read_length': args.read_length, 'seconds': seconds,
+                         'reads_per_second': args.reads / min(seconds)})
+    return rows
+
+
+@benchmark
+def bench_match(args):
+    '''Per-read latency of the slicing match_seq against the index-comparing match_locus.'''
+    from st import SuffixTreeMcCreight, match_seq, match_locus
+
+    ref = simulate_string(args.ref_length)
+    tree = SuffixTreeMcCreight(ref)
+    reads = [get_exact_read(ref, args.read_length) for _ in range(args.reads)]
+    rows = []
+    for method in [match_seq, match_locus]:
+        def run():
+            for read in reads:
+                method(tree, ref, read)
+        seconds = timed(run, args.repeat, args.warmup)
+        rows.append({'method': method.__name__, 'ref_length': args.ref_length, 'reads': args.reads,
+                     'read_length': args.read_length, 'seconds': seconds,
+                     'us_per_read': min(seconds) / args.reads * 1e6})
+    return rows
+
+
+@benchmark
+def bench_cigar(args):
+    '''CIGARs for exact hits: get_edits + edits_to_cigar per hit against exact_cigar.'''
+    from align import get_edits
+    from cigar import edits_to_cigar, exact_cigar
+
+    ref = simulate_string(args.ref_length)
+    hits = [get_exact_read(ref, args.read_length) for _ in range(args.reads)]
+
+    def general():
+        for read in hits:
+            edits_to_cigar(get_edits(read, read)[2])
+
+    def exact():
+        for read in hits:
+            exact_cigar(len(read))
+
+    rows = []
+    for method, run in [('get_edits+edits_to_cigar', general), ('exact_cigar', exact)]:
+        seconds = timed(run, args.repeat, args.warmup)
+        rows.append({'method': method, 'hits': args.reads, 'read_length': args.read_length,
+                     'seconds': seconds, 'us_per_hit': min(seconds) / args.reads * 1e6})
+    return rows
+
+
+@benchmark
+def bench_approx(args):
+    '''Throughput of approximate matching (approx_search) for k = 0, 1, 2 edits.'''
+    from st import SuffixTreeIndex, SuffixTreeMcCreight
+    from approx import approx_search
+
+    ref = simulate_string(args.ref_length)
+    index = SuffixTreeIndex(ref, SuffixTreeMcCreight)
+    reads_count = max(args.reads // 100, 1)
+    rows = []
+    for k in [0, 1, 2]:
+        reads = [get_approx_read(ref, args.read_length, k) for _ in range(reads_count)]
+
+        def run():
+            for read in reads:
+                approx_search(index, read, k)
+        seconds = timed(run, args.repeat, args.warmup)
+        rows.append({'edits': k, 'ref_length': args.ref_length, 'reads': reads_count,
+                     'read_length': args.read_length, 'seconds': seconds,
+                     'reads_per_second': reads_count / min(seconds)})
+    return rows
+
+
+################################################################
+# Code:
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark', usage='%(prog)s [options] [benchmark ...]',
+                                     description="Run st benchmarks and report timings as JSON.")
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help="Benchmarks to run ({}), default all".format(', '.join(sorted(BENCHMARKS))))
+    parser.add_argument('-o', '--output', help="JSON output file, default stdout")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement, default 3")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed runs before measuring, default 1")
+    parser.add_argument('--seed', type=int, default=2022, help="Random seed, default 2022")
+    parser.add_argument('--ref-length', type=int, default=100000, help="Reference length, default 100000")
+    parser.add_argument('--reads', type=int, default=20000, help="Number of reads, default 20000")
+    parser.add_argument('--read-length', type=int, default=50, help="Read length, default 50")
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8, 16],
+                        help="Worker process counts for the threads benchmark, default 1 2 4 8 16")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000, 1000000, 10000000],
+                        help="Reference lengths for the sweeping benchmarks, default 1000 to 10000000")
+    parser.add_argument('--inputs', nargs='+', choices=sorted(INPUTS), default=sorted(INPUTS),
+                        help="Reference kinds for the sweeping benchmarks, default all")
+    parser.add_argument('--time-limit', type=float, default=60,
+                        help="Skip further runs and larger sizes for a method after a run slower than this, or "
+                             "when its growth predicts one (seconds), default 60")
+    parser.add_argument('--node-tree-limit', type=int, default=1000000,
+                        help="Largest reference to build Node() trees for, default 1000000")
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark {!r}'.format(name))
+
+    results = []
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        random.seed(args.seed)
+        for row in BENCHMARKS[name](args):
+            results.append(dict(benchmark=name, **row))
+            print(name, json.dumps(row), file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Bounded LRU cache of search results (--cache, --cache-bytes).
+
+Amplicon and RNA-seq runs have many exact duplicate reads. search_many()
+already searches each distinct read of a chunk once; the cache keeps
+the hits, (position, cigar, reference length) tuples, of recent reads
+across chunks, so a duplicate read later in the file costs one dict
+lookup instead of a search and a CIGAR.
+
+The size of an entry is estimated as ENTRY_BYTES plus the read length
+plus HIT_BYTES per hit (the dict and list slots, tuple and ints; the
+CIGAR strings of exact hits are shared).
+"""
+
+################################################################
+# libraries:
+from collections import OrderedDict
+
+################################################################
+# Constants:
+
+ENTRY_BYTES = 200
+HIT_BYTES = 100
+
+################################################################
+# Functions:
+
+def parse_size(text):
+    '''Bytes in a size like 512, 64K, 100M or 2G.
+
+    Example:
+    print(parse_size('64K'))
+    #>>> 65536
+    '''
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+################################################################
+# Classes:
+
+class HitCache(object):
+    def __init__(self, max_entries=None, max_bytes=None):
+        ''' LRU cache from read to its list of hits, holding at most
+        max_entries reads and max_bytes (estimated) bytes, either unbounded
+        if None.
+
+        Example:
+        cache = HitCache(max_entries=2)
+        cache.put('ACG', [(4, '3M', 3)])
+        print(cache.get('ACG'), cache.get('TTT'), cache.hits, cache.misses)
+        #>>> [(4, '3M', 3)] None 1 1
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # read -> (hits, size)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, read):
+        '''The cached hits of read (most recently used from now on), None
+        if read is not cached.'''
+        entry = self._entries.get(read)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(read)
+        return entry[0]
+
+    def put(self, read, hits):
+        size = ENTRY_BYTES + len(read) + HIT_BYTES * len(hits)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else.
+        old = self._entries.pop(read, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._entries[read] = (hits, size)
+        self.nbytes += size
+        while ((self.max_entries is not None and len(self._entries) > self.max_entries)
+               or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
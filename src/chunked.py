@@ -0,0 +1,253 @@
+"""Building the array-backed suffix tree in buckets (st index --prefix-length).
+
+The suffixes are partitioned by their first k letters, as in the
+per-bucket construction of Wavefront and ERA:
+
+    bucket 'AC'  = every suffix starting with AC
+    bucket 'G$'  = the one suffix G$ (a suffix shorter than k letters
+                   ends with the sentinel and so is alone in its bucket)
+
+The subtree of a bucket only depends on the string and its suffixes, so
+the buckets are built one at a time, each into small arrays of its own
+(CompactSuffixTree.add_suffixes, walking every suffix from the root), and
+optionally in parallel by forked worker processes. In key order, every
+bucket subtree is then appended to the final arrays and hung below the
+root. The top k levels shared by the buckets are made with the stack of
+the rightmost path, as when building a suffix tree from a suffix array
+and its LCPs: the key of each bucket shares lcp letters with the previous
+key. Nothing is recursive.
+
+With a checkpoint directory every finished bucket is written to it, so a
+build that is stopped can be resumed: the buckets already in the
+directory are read back instead of being built again. progress(done,
+total, suffixes done, total suffixes) is called after every bucket.
+
+Building a bucket walks each suffix from the root like the naive builder
+(no suffix links cross buckets), so the time is O(n log n) on random DNA
+and O(n^2) for very repetitive strings; the buckets bound the memory of
+each worker and the work lost when a build is stopped.
+"""
+
+################################################################
+# libraries:
+import os
+import sys
+import json
+import hashlib
+import multiprocessing
+from array import array
+
+from compact_st import CompactSuffixTree
+
+################################################################
+# Constants:
+
+FIELDS = ['start', 'end', 'leaf', 'first_child', 'next_sibling']
+MANIFEST = 'checkpoint.json'
+
+################################################################
+# Functions:
+
+def bucket_positions(string, k):
+    '''The suffixes of string grouped by their first k letters: a list of
+    (key, array of positions) sorted by key.
+
+    Example:
+    print([(key, list(p)) for key, p in bucket_positions(b'abab$', 2)])
+    #>>> [(b'$', [4]), (b'ab', [0, 2]), (b'b$', [3]), (b'ba', [1])]
+    '''
+    buckets = {}
+    for i in range(len(string)):
+        key = string[i:i+k]
+        positions = buckets.get(key)
+        if positions is None:
+            positions = buckets[key] = array('i')
+        positions.append(i)
+    return sorted(buckets.items())
+
+
+def build_bucket(string, positions):
+    '''Arrays (FIELDS) of the suffix tree of the suffixes at positions of
+    string (which ends with the sentinel). Node 0 is the root.'''
+    tree = CompactSuffixTree.__new__(CompactSuffixTree)
+    tree.string = string
+    tree.start, tree.end, tree.leaf = array('i', [0]), array('i', [0]), array('i', [-1])
+    tree.first_child, tree.next_sibling = array('i', [-1]), array('i', [-1])
+    tree.add_suffixes(positions, len(string) - 1)
+    return [getattr(tree, field) for field in FIELDS]
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def merge(string, buckets):
+    '''A CompactSuffixTree over string (with its sentinel) from buckets,
+    (key, bucket arrays) pairs in key order.'''
+    tree = CompactSuffixTree.__new__(CompactSuffixTree)
+    tree.string = string
+    start, end, leaf = array('i', [0]), array('i', [0]), array('i', [-1])
+    first_child, next_sibling = array('i', [-1]), array('i', [-1])
+    stack = [(0, 0)]  # (node, string depth) on the path to the last bucket.
+    previous = None
+    for key, (b_start, b_end, b_leaf, b_first_child, b_next_sibling) in buckets:
+        lcp = 0 if previous is None else _common_prefix(previous, key)
+        previous = key
+        last = -1
+        while stack[-1][1] > lcp:
+            last = stack.pop()[0]
+        parent, depth = stack[-1]
+        if depth < lcp:
+            # split the edge parent->last (the newest child of parent) at lcp.
+            node = len(start)
+            start.append(start[last])
+            end.append(start[last] + lcp - depth)
+            leaf.append(-1)
+            first_child.append(last)
+            next_sibling.append(next_sibling[last])
+            first_child[parent] = node
+            next_sibling[last] = -1
+            start[last] += lcp - depth
+            stack.append((node, lcp))
+            parent = node
+        # append the bucket without its root; its only child hangs below parent.
+        offset = len(start) - 1
+        start.extend(b_start[1:])
+        end.extend(b_end[1:])
+        leaf.extend(b_leaf[1:])
+        first_child.extend(array('i', (c if c == -1 else c + offset for c in b_first_child[1:])))
+        next_sibling.extend(array('i', (c if c == -1 else c + offset for c in b_next_sibling[1:])))
+        top = b_first_child[0] + offset
+        stack.append((top, end[top] - start[top]))  # the bucket's edge starts at depth 0.
+        start[top] += lcp
+        next_sibling[top] = first_child[parent]
+        first_child[parent] = top
+    tree.start, tree.end, tree.leaf = start, end, leaf
+    tree.first_child, tree.next_sibling = first_child, next_sibling
+    tree._leaf_intervals()
+    return tree
+
+
+def progress_printer(out=sys.stderr):
+    '''A progress callback writing one line per bucket to out.'''
+    def progress(done, total, suffixes, total_suffixes):
+        out.write('st: bucket {}/{} done, {:.1f}% of the suffixes\n'.format(
+            done, total, 100.0 * suffixes / max(total_suffixes, 1)))
+        out.flush()
+    return progress
+
+
+# string and buckets for the worker processes, set before forking (as in mapper.py).
+_worker_string = None
+_worker_buckets = None
+_worker_checkpoint = None
+
+
+def _build_task(b):
+    arrays = build_bucket(_worker_string, _worker_buckets[b][1])
+    if _worker_checkpoint is not None:
+        _worker_checkpoint.save(b, arrays)
+    return arrays
+
+
+def build_chunked(string, k=2, threads=1, checkpoint=None, progress=None):
+    '''A CompactSuffixTree over string (str or bytes) built in buckets of
+    suffixes sharing their first k letters, with threads worker processes.
+    checkpoint is a directory for resuming the build (created if missing).
+
+    Example:
+    tree = build_chunked('mississippi', k=2)
+    print(sorted(tree.search('ss')))
+    #>>> [2, 5]
+    '''
+    global _worker_string, _worker_buckets, _worker_checkpoint
+    if isinstance(string, str):
+        string = string.encode()
+    string = bytes(string) + b'$'  # add sentinal to string.
+    buckets = bucket_positions(string, k)
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint, string, k)
+    total_suffixes = len(string)
+
+    def built():
+        todo = [b for b in range(len(buckets)) if checkpoint is None or not checkpoint.has(b)]
+        if threads > 1 and todo:
+            pool = multiprocessing.get_context('fork').Pool(threads)
+            results = pool.imap(_build_task, todo)
+        else:
+            results = map(_build_task, todo)
+        todo = set(todo)
+        try:
+            for b in range(len(buckets)):
+                if b in todo:
+                    yield next(results)
+                else:
+                    yield checkpoint.load(b)
+        finally:
+            if threads > 1 and todo:
+                pool.terminate()
+
+    def reported(arrays):
+        suffixes = 0
+        for b, bucket in enumerate(arrays):
+            suffixes += len(buckets[b][1])
+            if progress is not None:
+                progress(b + 1, len(buckets), suffixes, total_suffixes)
+            yield buckets[b][0], bucket
+
+    _worker_string, _worker_buckets, _worker_checkpoint = string, buckets, checkpoint
+    try:
+        return merge(string, reported(built()))
+    finally:
+        _worker_string = _worker_buckets = _worker_checkpoint = None
+
+
+################################################################
+# Classes:
+
+class Checkpoint(object):
+    def __init__(self, directory, string, k):
+        ''' Directory of finished buckets of the build of string with
+        prefix length k. A directory left by another build is an error.'''
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        manifest = {'sha256': hashlib.sha256(string).hexdigest(), 'k': k}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                if json.load(f) != manifest:
+                    raise ValueError('{} holds the checkpoint of another build'.format(directory))
+        else:
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+
+    def _path(self, b):
+        return os.path.join(self.directory, 'bucket-{}.bin'.format(b))
+
+    def has(self, b):
+        return os.path.exists(self._path(b))
+
+    def save(self, b, arrays):
+        '''Write bucket b (its FIELDS arrays); the file only appears once
+        it is complete.'''
+        temporary = self._path(b) + '.tmp'
+        with open(temporary, 'wb') as f:
+            array('q', [len(arrays[0])]).tofile(f)
+            for values in arrays:
+                values.tofile(f)
+        os.replace(temporary, self._path(b))
+
+    def load(self, b):
+        with open(self._path(b), 'rb') as f:
+            count = array('q')
+            count.fromfile(f, 1)
+            arrays = []
+            for _ in FIELDS:
+                values = array('i')
+                values.fromfile(f, count[0])
+                arrays.append(values)
+        return arrays
@@ -37,13 +37,7 @@ def cigar_to_edits(cigar: str):
     'MDMMMMMMIMMMM'
 
     """
-    CIGAR_pairs = split_pairs(cigar)
-    
-    edits = ''
-    for pair in CIGAR_pairs:
-        edits += int(pair[0]) * pair[1]
-    
-    return edits
+    return ''.join(op * n for n, op in split_pairs(cigar))
 
 
 def split_blocks(x: str):
@@ -78,10 +72,23 @@ def edits_to_cigar(edits: str):
     '1M1D6M1I4M'
 
     """
-    element_list = split_blocks(edits)
-    cigar=''
-    for a in element_list:
-        short = '{}{}'.format(len(a),a[0])
-        cigar+= short
-    
-    return cigar
+    # an exact match is one block, so skip the regular expression.
+    if edits.count('M') == len(edits):
+        return exact_cigar(len(edits))
+    return ''.join('{}{}'.format(len(a), a[0]) for a in split_blocks(edits))
+
+
+def exact_cigar(length: int):
+    """The CIGAR of an exact match of the given length.
+
+    Args:
+        length (int): Length of the read
+
+    Returns:
+        str: The CIGAR, length matches.
+
+    >>> exact_cigar(12)
+    '12M'
+
+    """
+    return '{}M'.format(length) if length > 0 else ''
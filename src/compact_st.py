@@ -0,0 +1,358 @@
+"""Array-backed suffix tree.
+
+The Node() tree in st.py spends a Python object, an attribute dict and an
+`out` dict on every node. Here the tree is stored column-wise in flat
+integer arrays instead (one entry per node):
+
+    start, end      edge label of the node (string[start:end])
+    leaf            suffix index for leaves, -1 for internal nodes
+    first_child     first child of the node, -1 for leaves
+    next_sibling    next child of the same parent, -1 for the last one
+    leaf_lo, leaf_hi  the leaves below the node are leaf_array[leaf_lo:leaf_hi]
+
+leaf_array holds the suffix indices of the leaves in depth-first order,
+so reporting the z occurrences below a node is one slice.
+
+Node 0 is the root. Children are kept in a linked list, so finding the
+child for a letter is a scan over at most |alphabet| siblings (5 for DNA
+plus '$'). The tree is built with McCreight's algorithm directly into the
+arrays; parent, string-depth and suffix links are only kept during
+construction.
+"""
+
+################################################################
+# libraries:
+import sys
+import argparse
+from array import array
+
+################################################################
+# Classes:
+
+class CompactSuffixTree(object):
+    def __init__(self, string):
+        ''' Build an array-backed suffix tree over string (str or bytes).
+
+        Example:
+        tree = CompactSuffixTree('mississippi')
+        print(sorted(tree.search('ss')))
+        #>>> [2, 5]
+        '''
+        if isinstance(string, str):
+            string = string.encode()
+        self.string = bytes(string) + b'$'  # add sentinal to string.
+        self.start = array('i')
+        self.end = array('i')
+        self.leaf = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self._build()
+        self._leaf_intervals()
+
+    def __len__(self):
+        return len(self.start)
+
+    def _build(self):
+        string = self.string
+        string_length = len(string)
+        start, end, leaf = self.start, self.end, self.leaf
+        first_child, next_sibling = self.first_child, self.next_sibling
+        # construction only bookkeeping:
+        parent, depth, link = array('i'), array('i'), array('i')
+
+        def new_node(b, e, suffix, p, d):
+            start.append(b)
+            end.append(e)
+            leaf.append(suffix)
+            first_child.append(-1)
+            next_sibling.append(-1)
+            parent.append(p)
+            depth.append(d)
+            link.append(-1)
+            return len(start) - 1
+
+        def add_leaf(node, j, suffix):
+            child = new_node(j, string_length, suffix, node, string_length - suffix)
+            next_sibling[child] = first_child[node]
+            first_child[node] = child
+            return child
+
+        def find(node, c):
+            child = first_child[node]
+            while child != -1 and string[start[child]] != c:
+                child = next_sibling[child]
+            return child
+
+        def split(node, child, k):
+            # split the edge node->child after k letters, returns the new node.
+            branch = new_node(start[child], start[child]+k, -1, node, depth[node]+k)
+            if first_child[node] == child:
+                first_child[node] = branch
+            else:
+                prev = first_child[node]
+                while next_sibling[prev] != child:
+                    prev = next_sibling[prev]
+                next_sibling[prev] = branch
+            next_sibling[branch] = next_sibling[child]
+            next_sibling[child] = -1
+            first_child[branch] = child
+            parent[child] = branch
+            start[child] += k
+            return branch
+
+        root = new_node(0, 0, -1, 0, 0)
+        link[root] = root
+        last = add_leaf(root, 0, 0)
+        for i in range(1, string_length):
+            head = parent[last]  # head of the previous suffix.
+            if head == root:
+                current = root
+            elif link[head] != -1:
+                current = link[head]
+            else:
+                # fast-scan over s(head), only looking at first letters.
+                current = link[parent[head]]
+                remaining = depth[head] - 1 - depth[current]
+                j = i + depth[current]
+                while remaining > 0:
+                    child = find(current, string[j])
+                    length = end[child] - start[child]
+                    if length > remaining:
+                        current = split(current, child, remaining)
+                        break
+                    current = child
+                    j += length
+                    remaining -= length
+                link[head] = current
+                if remaining > 0:
+                    last = add_leaf(current, i + depth[current], i)
+                    continue
+
+            # slow-scan letter by letter from current.
+            j = i + depth[current]
+            while True:
+                child = find(current, string[j])
+                if child == -1:
+                    last = add_leaf(current, j, i)
+                    break
+                length = end[child] - start[child]
+                b = start[child]
+                k = 1
+                while k < length and string[j+k] == string[b+k]:
+                    k += 1
+                if k == length:
+                    current = child
+                    j += k
+                else:
+                    current = split(current, child, k)
+                    last = add_leaf(current, j+k, i)
+                    break
+
+    def _leaf_intervals(self):
+        leaf, first_child, next_sibling = self.leaf, self.first_child, self.next_sibling
+        leaf_lo = array('i', [-1]) * len(leaf)
+        leaf_hi = array('i', [-1]) * len(leaf)
+        leaf_array = array('i')
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if leaf_lo[node] == -1:  # first visit.
+                leaf_lo[node] = len(leaf_array)
+                if leaf[node] != -1:
+                    leaf_array.append(leaf[node])
+                    leaf_hi[node] = len(leaf_array)
+                    continue
+                stack.append(node)  # visit again when the children are done.
+                child = first_child[node]
+                while child != -1:
+                    stack.append(child)
+                    child = next_sibling[child]
+            else:
+                leaf_hi[node] = len(leaf_array)
+        self.leaf_lo, self.leaf_hi, self.leaf_array = leaf_lo, leaf_hi, leaf_array
+
+    def insert(self, *texts):
+        '''Append each text (a separator and a new record, e.g. b'#ACGT') to
+        the string and add the suffixes starting in the new records,
+        walking each from the root as the naive builder does. The existing
+        nodes are kept, so adding the suffixes costs time proportional to
+        the new texts, but numbering the leaves again is one pass over the
+        whole tree. The old sentinel becomes the first letter of the first
+        text. Reads never contain the separator or the sentinel, so each
+        suffix is only compared up to the end of its record, where it gets
+        a leaf of its own.'''
+        texts = [text.encode() if isinstance(text, str) else text for text in texts]
+        for field in ['start', 'end', 'leaf', 'first_child', 'next_sibling']:
+            values = getattr(self, field)
+            if not isinstance(values, array):  # memory-mapped, see index_io.MappedIndex.
+                setattr(self, field, array('i', values))
+        begin = len(self.string) - 1
+        self.string = b''.join([bytes(self.string[:-1])] + texts + [b'$'])
+        for text in texts:
+            stop = begin + len(text)  # the next separator or the sentinel.
+            self.add_suffixes(range(begin + 1, stop), stop)
+            begin = stop
+        self._leaf_intervals()
+
+    def add_suffixes(self, suffixes, stop):
+        '''Add the suffixes (start positions in string) to the tree, each
+        walked from the root and compared up to position stop, where it
+        gets a leaf of its own. Used by insert() and to build buckets of
+        suffixes (chunked.py); the leaf intervals are not updated.'''
+        string = self.string
+        string_length = len(string)
+        start, end, leaf = self.start, self.end, self.leaf
+        first_child, next_sibling = self.first_child, self.next_sibling
+
+        def new_node(b, e, suffix, node):
+            start.append(b)
+            end.append(e)
+            leaf.append(suffix)
+            first_child.append(-1)
+            next_sibling.append(first_child[node])
+            first_child[node] = len(start) - 1
+            return len(start) - 1
+
+        for i in suffixes:
+            node = 0
+            j = i
+            while True:
+                if j == stop:
+                    new_node(stop, string_length, i, node)
+                    break
+                child = first_child[node]
+                while child != -1 and string[start[child]] != string[j]:
+                    child = next_sibling[child]
+                if child == -1:
+                    new_node(j, string_length, i, node)
+                    break
+                b = start[child]
+                length = end[child] - b
+                k = 1
+                while k < length and j + k < stop and string[j+k] == string[b+k]:
+                    k += 1
+                if k == length:
+                    node = child
+                    j += k
+                    continue
+                # split the edge node->child after k letters.
+                branch = len(start)
+                start.append(b)
+                end.append(b + k)
+                leaf.append(-1)
+                first_child.append(child)
+                next_sibling.append(next_sibling[child])
+                if first_child[node] == child:
+                    first_child[node] = branch
+                else:
+                    prev = first_child[node]
+                    while next_sibling[prev] != child:
+                        prev = next_sibling[prev]
+                    next_sibling[prev] = branch
+                next_sibling[child] = -1
+                start[child] = b + k
+                new_node(j + k, string_length, i, branch)
+                break
+
+    def locus(self, read):
+        '''Returns the node at or below which read ends, -1 if read does not occur.'''
+        if isinstance(read, str):
+            read = read.encode()
+        string = self.string
+        start, end = self.start, self.end
+        first_child, next_sibling = self.first_child, self.next_sibling
+        node = 0
+        i = 0
+        m = len(read)
+        while i < m:
+            child = first_child[node]
+            while child != -1 and string[start[child]] != read[i]:
+                child = next_sibling[child]
+            if child == -1:
+                return -1
+            b = start[child]
+            length = min(end[child] - b, m - i)
+            for k in range(1, length):
+                if string[b+k] != read[i+k]:
+                    return -1
+            node = child
+            i += length
+        return node
+
+    def leaves(self, node, max_hits=None):
+        '''The suffix indices of all leaves below node (the first max_hits).'''
+        lo, hi = self.leaf_lo[node], self.leaf_hi[node]
+        return self.leaf_array[lo:hi if max_hits is None else min(hi, lo + max_hits)]
+
+    def search(self, read, max_hits=None):
+        '''Returns the start positions of all exact occurrences of read, or
+        of the first max_hits of them (in leaf order).'''
+        if not read:
+            return []
+        node = self.locus(read)
+        if node == -1:
+            return []
+        return self.leaves(node, max_hits)
+
+    def count(self, read):
+        '''Number of occurrences of read, from the leaf interval of its locus.'''
+        if not read:
+            return 0
+        node = self.locus(read)
+        return 0 if node == -1 else self.leaf_hi[node] - self.leaf_lo[node]
+
+    def nbytes(self):
+        '''Bytes used by the node arrays and the string.'''
+        arrays = [self.start, self.end, self.leaf, self.first_child, self.next_sibling,
+                  self.leaf_lo, self.leaf_hi, self.leaf_array]
+        return len(self.string) + sum(a.itemsize * len(a) for a in arrays)
+
+    def bytes_per_base(self):
+        return self.nbytes() / max(len(self.string) - 1, 1)
+
+
+################################################################
+# Functions:
+
+def node_tree_bytes(tree, ref):
+    '''Approximate bytes used by a Node() tree from st.py (objects, attribute
+    dicts, out dicts and the int objects they hold) plus the reference.'''
+    if tree == None:
+        return 0
+    total = sys.getsizeof(ref)
+    seen = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        total += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.out)
+        for value in (node.start, node.end, node.suffix_order_leaf):
+            if isinstance(value, int) and id(value) not in seen and not -5 <= value <= 256:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+        stack.extend(node.out.values())
+    return total
+
+
+################################################################
+# Code:
+
+if __name__ == '__main__':
+    from st import BUILDERS
+    from SEQsimulator import simulate_string
+
+    parser = argparse.ArgumentParser(prog='compact_st', usage='%(prog)s [options]',
+                                     description="Report bytes per base for Node() and array-backed suffix trees.")
+    parser.add_argument('-m', nargs='+', type=int, help='Reference lengths, default 1000 10000 100000',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--builder', choices=sorted(BUILDERS), default='mccreight',
+                        help="Builder used for the Node() tree, default mccreight")
+    args = parser.parse_args()
+
+    print('\t'.join(['length', 'nodes', 'node_tree_bytes_per_base', 'compact_bytes_per_base']))
+    for m in args.m:
+        ref = simulate_string(m)
+        compact = CompactSuffixTree(ref)
+        tree = BUILDERS[args.builder](ref)
+        print('\t'.join([str(m), str(len(compact)),
+                         '{:.1f}'.format(node_tree_bytes(tree, ref) / m),
+                         '{:.1f}'.format(compact.bytes_per_base())]))
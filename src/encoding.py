@@ -0,0 +1,90 @@
+"""Encoding DNA for the indexes.
+
+The reference and the reads are translated once into bytes of letter
+codes (one byte per base, so every index can compare and slice the
+buffer directly):
+
+    A C G T   0 1 2 3
+    N         4  any other reference letter (N, IUPAC codes, ...)
+    READ_N    5  any other read letter; never occurs in a reference, so a
+                 read with an N does not match there (not even an N)
+
+Upper and lower case (soft-masked) letters get the same code. The record
+separator '#' and the '$' sentinel the backends append keep their ASCII
+values, which no code can be, so reads cannot match across them.
+
+Codes are one byte per base instead of packed 2-bit because the suffix
+trees and arrays index single letters at arbitrary positions; A, C, G
+and T only use the low 2 bits.
+"""
+
+################################################################
+# Constants:
+
+ALPHABET = 'ACGT'
+N = 4
+READ_N = 5
+
+
+def _table(default):
+    table = bytearray([default]) * 256
+    for code, letter in enumerate(ALPHABET):
+        table[ord(letter)] = table[ord(letter.lower())] = code
+    return bytes(table)
+
+
+REFERENCE_TABLE = _table(N)
+READ_TABLE = _table(READ_N)
+DECODE_TABLE = bytes(range(256)).translate(bytes.maketrans(bytes(range(6)), b'ACGTNN'))
+COMPLEMENT = str.maketrans('ACGTacgt', 'TGCAtgca')
+CODE_COMPLEMENT = bytes.maketrans(bytes([0, 1, 2, 3]), bytes([3, 2, 1, 0]))
+
+################################################################
+# Functions:
+
+def encode_reference(seq):
+    '''Codes of a reference sequence (str or bytes).
+
+    Example:
+    print(list(encode_reference('ACgtNR')))
+    #>>> [0, 1, 2, 3, 4, 4]
+    '''
+    if isinstance(seq, str):
+        seq = seq.encode('ascii', 'replace')
+    return seq.translate(REFERENCE_TABLE)
+
+
+def encode_read(seq):
+    '''Codes of a read (str or bytes); letters other than ACGT become READ_N.'''
+    if isinstance(seq, str):
+        seq = seq.encode('ascii', 'replace')
+    return seq.translate(READ_TABLE)
+
+
+def decode(codes):
+    '''The letters of encoded bytes (N for both N and READ_N).
+
+    Example:
+    print(decode(encode_read('acgtx')))
+    #>>> ACGTN
+    '''
+    return bytes(codes).translate(DECODE_TABLE).decode('ascii')
+
+
+def reverse_complement(seq):
+    '''Reverse complement of letters (str; other letters than ACGT are kept)
+    or of codes (bytes).
+
+    Example:
+    print(reverse_complement('AACgN'))
+    #>>> NcGTT
+    '''
+    if isinstance(seq, str):
+        return seq.translate(COMPLEMENT)[::-1]
+    return bytes(seq).translate(CODE_COMPLEMENT)[::-1]
+
+
+def encode_records(fasta_recs):
+    '''Yields the [name, encoded seq] of [name, seq] FASTA records.'''
+    for name, seq in fasta_recs:
+        yield [name, encode_reference(seq)]
@@ -0,0 +1,131 @@
+"""One index over all records of a FASTA file.
+
+The records are concatenated with a separator between them,
+
+    text = seq0 + '#' + seq1 + '#' + ... + seqN
+
+and a single index (any backend with search(read)) is built over text.
+starts[k] is where record k begins in text, so a hit at position p in
+text is translated back to (record, offset) with a binary search. Reads
+never contain the separator, so no hit can span two records.
+
+append() adds a record to a built index whose backend has insert(text)
+(the suffix trees): only the suffixes of the new record are inserted,
+but the leaves of the whole tree are numbered again (a linear pass, about
+a fifth of a rebuild).
+
+The records can be str, or bytes encoded with encoding.encode_reference
+(then genome.encoded is True and reads must be encoded with
+encoding.encode_read before searching).
+"""
+
+################################################################
+# libraries:
+from array import array
+from bisect import bisect_right
+
+################################################################
+# Constants:
+
+SEPARATOR = '#'
+
+################################################################
+# Classes:
+
+class GeneralizedIndex(object):
+    def __init__(self, names, starts, lengths, text, index, encoded=False):
+        ''' names, starts and lengths of the records in text and an index over text.
+        Use GeneralizedIndex.build() to make one from FASTA records.'''
+        self.names = names
+        self.starts = starts
+        self.lengths = lengths
+        self.text = text
+        self.index = index
+        self.encoded = encoded
+
+    @classmethod
+    def build(cls, fasta_recs, build_index):
+        '''Concatenate fasta_recs ([name, seq] pairs) and index the result with
+        build_index(text).
+
+        Example:
+        genome = GeneralizedIndex.build([['chr1', 'mississippi'], ['chr2', 'ssi']], SuffixArray)
+        print(sorted(genome.hits('ssi')))
+        #>>> [(0, 2, 2), (0, 5, 5), (1, 0, 12)]
+        '''
+        names = []
+        starts = array('q')
+        lengths = array('q')
+        parts = []  # str records, joined at the end.
+        # bytes records are appended as they come, so only the text and one
+        # record are in memory at a time.
+        text = bytearray()
+        encoded = False
+        position = 0
+        for name, seq in fasta_recs:
+            encoded = isinstance(seq, bytes)
+            if names and encoded:
+                text += SEPARATOR.encode()
+            names.append(name)
+            starts.append(position)
+            lengths.append(len(seq))
+            position += len(seq) + len(SEPARATOR)
+            if encoded:
+                text += seq
+            else:
+                parts.append(seq)
+        text = bytes(text) if encoded else SEPARATOR.join(parts)
+        del parts
+        index = build_index(text)
+        # keep one copy of the text: the index's own (with sentinel) if it has one.
+        return cls(names, starts, lengths, getattr(index, 'string', text), index, encoded)
+
+    def append(self, name, seq):
+        '''Add the record [name, seq] at the end of text and insert its
+        suffixes into the index. seq must be encoded if the genome is.
+
+        Example:
+        genome = GeneralizedIndex.build([['chr1', 'mississippi']], CompactSuffixTree)
+        genome.append('chr2', 'ssi')
+        print(sorted(genome.hits('ssi')))
+        #>>> [(0, 2, 2), (0, 5, 5), (1, 0, 12)]
+        '''
+        self.extend([[name, seq]])
+
+    def extend(self, fasta_recs):
+        '''append() every [name, seq] of fasta_recs, numbering the leaves of
+        the index once.'''
+        fasta_recs = list(fasta_recs)
+        if not hasattr(self.index, 'insert'):
+            raise ValueError('records cannot be added to a {} index, rebuild it'.format(type(self.index).__name__))
+        if not self.names or not all(seq for _, seq in fasta_recs):
+            raise ValueError('only non-empty records can be added to a non-empty index')
+        if any(isinstance(seq, bytes) != self.encoded for _, seq in fasta_recs):
+            raise ValueError('the records must be {}'.format('encoded bytes' if self.encoded else 'str'))
+        if not isinstance(self.starts, array):  # memory-mapped, see index_io.MappedIndex.
+            self.starts = array('q', self.starts)
+            self.lengths = array('q', self.lengths)
+        separator = SEPARATOR.encode() if self.encoded else SEPARATOR
+        for name, seq in fasta_recs:
+            self.starts.append(self.starts[-1] + self.lengths[-1] + len(SEPARATOR))
+            self.lengths.append(len(seq))
+            self.names.append(name)
+        self.index.insert(*[separator + seq for _, seq in fasta_recs])
+        self.text = getattr(self.index, 'string', None) or self.index.ref
+
+    def __len__(self):
+        return len(self.names)
+
+    def locate(self, position):
+        '''Translate a position in text to (record, offset in record).'''
+        record = bisect_right(self.starts, position) - 1
+        return record, position - self.starts[record]
+
+    def hits(self, read):
+        '''Yields (record, offset in record, position in text) of every exact
+        occurrence of read.'''
+        m = len(read)
+        for position in self.index.search(read):
+            record, offset = self.locate(position)
+            if offset + m <= self.lengths[record]:
+                yield record, offset, position
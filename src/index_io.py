@@ -0,0 +1,166 @@
+"""Saving array-backed indexes to disk and memory-mapping them back.
+
+File layout (all offsets in bytes):
+
+    0   magic  b'STINDEX\\0'
+    8   version (uint32, little endian)
+    12  header length h (uint64, little endian)
+    20  header, h bytes of JSON (backend, byte order, FASTA checksum,
+        whether the text is encoded (encoding.py), record names and the
+        (typecode, offset, count) of every array)
+    ..  padding to a multiple of 8
+    ..  raw array data, each array starting at a multiple of 8
+
+The file holds one GeneralizedIndex: the record starts and lengths plus
+the arrays of the backend index over the concatenated records.
+Loading maps the file read-only and hands out memoryviews cast to the
+array typecodes, so nothing is copied or parsed and processes mapping
+the same file share its pages through the page cache.
+
+Records added later (st index --append) have their suffixes inserted
+into the loaded tree (GeneralizedIndex.extend) and the whole index is
+written again, so loading stays a plain mapping. The header keeps the
+checksum of the FASTA the index was built from and lists the FASTA files
+appended since.
+"""
+
+################################################################
+# libraries:
+import sys
+import json
+import mmap
+import os
+import struct
+import hashlib
+
+from compact_st import CompactSuffixTree
+from sa import SuffixArray
+from generalized import GeneralizedIndex
+
+################################################################
+# Constants:
+
+MAGIC = b'STINDEX\0'
+VERSION = 4
+ALIGNMENT = 8
+PREFIX = struct.Struct('<IQ')  # version, header length.
+
+# backend name -> (class, names of the attributes holding its arrays)
+INDEX_TYPES = {
+    'compact': (CompactSuffixTree, ['string', 'start', 'end', 'leaf', 'first_child', 'next_sibling',
+                                    'leaf_lo', 'leaf_hi', 'leaf_array']),
+    'sa': (SuffixArray, ['string', 'sa']),
+}
+
+################################################################
+# Functions:
+
+def fasta_checksum(path):
+    '''sha256 hex digest of a file, read in blocks.'''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _typecode(values):
+    return 'B' if isinstance(values, (bytes, bytearray)) else values.typecode
+
+
+def write_index(path, genome, backend, fasta_path, appended=(), checksum=None):
+    '''Write genome, a GeneralizedIndex whose index is of the given backend
+    type, to path. appended lists the [path, checksum] of FASTA files whose
+    records were added after building from fasta_path; checksum is that of
+    fasta_path if already known.'''
+    cls, fields = INDEX_TYPES[backend]
+    arrays = [('starts', genome.starts), ('lengths', genome.lengths)]
+    arrays += [(field, getattr(genome.index, field)) for field in fields]
+    table = {}
+    chunks = []
+    offset = 0
+    for field, values in arrays:
+        offset = _aligned(offset)
+        table[field] = [_typecode(values), offset, len(values)]
+        chunks.append((offset, values))
+        offset += len(values) * memoryview(values).itemsize
+    header = json.dumps({
+        'backend': backend,
+        'byteorder': sys.byteorder,
+        'fasta': fasta_path,
+        'sha256': checksum or fasta_checksum(fasta_path),
+        'appended': list(appended),
+        'encoded': genome.encoded,
+        'names': genome.names,
+        'arrays': table,
+    }).encode()
+    data_start = _aligned(len(MAGIC) + PREFIX.size + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(PREFIX.pack(VERSION, len(header)))
+        f.write(header)
+        for offset, values in chunks:
+            f.write(bytes(data_start + offset - f.tell()))  # padding.
+            f.write(values)
+
+
+def append_records(path, fasta_recs, fasta_path):
+    '''Add fasta_recs ([name, seq] pairs from fasta_path, encoded if the
+    index is) to the index file at path: their suffixes are inserted into
+    the loaded tree and the file is replaced by the updated index. Raises
+    ValueError if the backend cannot insert records.'''
+    mapped = MappedIndex(path)
+    header = mapped.header
+    if not hasattr(INDEX_TYPES[mapped.backend][0], 'insert'):
+        raise ValueError('records cannot be added to a {} index, rebuild it'.format(mapped.backend))
+    fasta_recs = list(fasta_recs)
+    if any(isinstance(seq, bytes) != header['encoded'] for _, seq in fasta_recs):
+        raise ValueError('the index is {}, use the same --alphabet'.format(
+            'encoded DNA' if header['encoded'] else 'text'))
+    mapped.genome.extend(fasta_recs)
+    appended = header.get('appended', []) + [[fasta_path, fasta_checksum(fasta_path)]]
+    temporary = path + '.tmp'
+    write_index(temporary, mapped.genome, mapped.backend, header['fasta'], appended, header['sha256'])
+    os.replace(temporary, path)
+
+
+class MappedIndex(object):
+    '''An index file mapped into memory. genome is a GeneralizedIndex backed
+    directly by the mapped pages.'''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not an st index file'.format(path))
+        version, header_length = PREFIX.unpack_from(mm, len(MAGIC))
+        if version != VERSION:
+            raise ValueError('{} has index version {}, expected {}'.format(path, version, VERSION))
+        header_start = len(MAGIC) + PREFIX.size
+        self.header = json.loads(mm[header_start:header_start+header_length])
+        if self.header['byteorder'] != sys.byteorder:
+            raise ValueError('{} was written on a {} endian machine'.format(path, self.header['byteorder']))
+        self.backend = self.header['backend']
+        cls, fields = INDEX_TYPES[self.backend]
+        data_start = _aligned(header_start + header_length)
+
+        view = memoryview(mm)
+        arrays = {}
+        for field, (typecode, offset, count) in self.header['arrays'].items():
+            begin = data_start + offset
+            arrays[field] = view[begin:begin + count * struct.calcsize(typecode)].cast(typecode)
+        index = cls.__new__(cls)
+        for field in fields:
+            setattr(index, field, arrays[field])
+        self.genome = GeneralizedIndex(list(self.header['names']), arrays['starts'], arrays['lengths'],
+                                       index.string, index, self.header['encoded'])
+
+    def verify(self, fasta_path):
+        '''True if fasta_path has the checksum of the FASTA the index was built from.'''
+        return fasta_checksum(fasta_path) == self.header['sha256']
@@ -0,0 +1,143 @@
+"""Seed-and-extend mapping of long reads.
+
+Long reads rarely occur exactly, so instead of searching the whole read:
+
+  1. seeds: walking along the read, the longest match of the rest of the
+     read is found with SuffixTreeIndex.locus; matches of at least min_seed
+     letters with at most max_occurrences hits are seeds (read pos, ref
+     pos, length).
+  2. chaining: seeds increasing in both read and reference position are
+     chained by dynamic programming over the seeds in read order; the
+     diagonal (ref pos - read pos) may change by at most max_indel from
+     one seed to the next, so indels drifting along the read stay in one
+     chain. The chains covering the most read letters are kept.
+  3. extension: the gaps between seeds, and the read ends before the first
+     and after the last seed, are aligned with align.banded_align.
+
+Time is the seed search, O(m) tree steps, O(k^2) for chaining k seeds,
+plus O(m * band) for the banded alignments (wider over the indels),
+instead of O(n * m) for aligning the read everywhere.
+Works on a SuffixTreeIndex from st.py.
+"""
+
+################################################################
+# libraries:
+from align import banded_align
+from cigar import edits_to_cigar
+
+################################################################
+# Functions:
+
+def find_seeds(index, read, min_seed=20, max_occurrences=50):
+    '''Returns (read pos, ref pos, length) of the maximal exact matches found
+    walking along read (each match starts where the previous one failed).'''
+    leaf_array = index.leaf_array
+    seeds = []
+    i = 0
+    m = len(read)
+    while i < m:
+        node, depth = index.locus(read, i)
+        if depth >= min_seed and node.leaf_hi - node.leaf_lo <= max_occurrences:
+            for position in leaf_array[node.leaf_lo:node.leaf_hi]:
+                seeds.append((i, position, depth))
+        i += max(depth, 1)
+    return seeds
+
+
+def chain_seeds(seeds, max_indel):
+    '''Chains of seeds increasing in read and reference position, where
+    the diagonal (ref pos - read pos) of each seed is within max_indel of
+    the previous seed in the chain, so small indels can add up along a
+    long read. Returns the chains with the highest number of read letters
+    covered (and the least diagonal change among those).'''
+    seeds = sorted(seeds)
+    # score[i]: (letters covered, -diagonal change) of the best chain ending
+    # with seeds[i], whose previous seed is seeds[previous[i]].
+    score = []
+    previous = []
+    for i, (q, r, length) in enumerate(seeds):
+        best, before = (length, 0), -1
+        for j in range(i):
+            q1, r1, l1 = seeds[j]
+            shift = abs((r - q) - (r1 - q1))
+            if q1 + l1 <= q and r1 + l1 <= r and shift <= max_indel:
+                candidate = (score[j][0] + length, score[j][1] - shift)
+                if candidate > best:
+                    best, before = candidate, j
+        score.append(best)
+        previous.append(before)
+    if not seeds:
+        return []
+    top = max(score)
+    chains = []
+    for i in range(len(seeds)):
+        if score[i] == top:
+            chain = []
+            while i != -1:
+                chain.append(seeds[i])
+                i = previous[i]
+            chains.append(chain[::-1])
+    return chains
+
+
+def _sam_edits(read_row, ref_row):
+    # alignment rows (read, reference) to SAM edit operations.
+    edits = []
+    for a, b in zip(read_row, ref_row):
+        if a == '-':
+            edits.append('D')
+        elif b == '-':
+            edits.append('I')
+        else:
+            edits.append('M')
+    return ''.join(edits)
+
+
+def _text(seq):
+    # banded_align builds str rows; encoded bytes become one char per code.
+    return seq.decode('latin-1') if isinstance(seq, bytes) else seq
+
+
+def extend_chain(ref, read, chain, band):
+    '''Align read along a chain of seeds. Returns (ref position, cigar,
+    ref length).'''
+    n = len(ref)
+    m = len(read)
+    q, r, _ = chain[0]
+    start = max(0, r - q)
+    edits = [_sam_edits(*banded_align(_text(read[:q]), _text(ref[start:r]), band))]
+    for (q1, r1, l1), (q2, r2, l2) in zip(chain, chain[1:]):
+        edits.append('M' * l1)
+        # the gap moves by the change of diagonal; keep band around both ends.
+        shift = abs((r2 - q2) - (r1 - q1))
+        edits.append(_sam_edits(*banded_align(_text(read[q1+l1:q2]), _text(ref[r1+l1:r2]), band + shift)))
+    q, r, length = chain[-1]
+    edits.append('M' * length)
+    q, r = q + length, r + length
+    edits.append(_sam_edits(*banded_align(_text(read[q:]), _text(ref[r:min(n, r + m - q)]), band)))
+    edits = ''.join(edits)
+
+    # deletions at the ends just move the alignment.
+    stripped = edits.lstrip('D')
+    start += len(edits) - len(stripped)
+    edits = stripped.rstrip('D')
+    span = edits.count('M') + edits.count('D')
+    return start, edits_to_cigar(edits), span
+
+
+def seed_extend(index, read, min_seed=20, max_occurrences=50, band=16, max_indel=200):
+    '''Map a long read: returns the sorted (position, cigar, ref length) of
+    the best chains of seeds, extended with banded alignment.
+
+    Example:
+    index = SuffixTreeIndex(ref)
+    print(seed_extend(index, read))
+    #>>> [(1234, '310M1I402M1D287M', 1000)]
+    '''
+    if not read or index.tree == None:
+        return []
+    seeds = find_seeds(index, read, min_seed, max_occurrences)
+    hits = set()
+    for chain in chain_seeds(seeds, max_indel):
+        hits.add(extend_chain(index.ref, read, chain, band))
+    return sorted(hits)
@@ -0,0 +1,330 @@
+"""Mapping reads against built indexes and formatting the SAM output.
+
+genome is a GeneralizedIndex over all FASTA records, so every read is
+searched once. Reads are mapped in chunks with search_many(), which
+searches each distinct read once and in sorted order. When both strands
+are mapped, the reverse complements go into the same batch, so they share
+the sorted traversal instead of needing a second pass. map_reads() does
+the work in this process; with
+threads > 1 the genome is shared with forked worker processes
+(copy-on-write, and page-cache shared for mmap'ed indexes) that map
+chunks of reads and send back their SAM lines.
+"""
+
+################################################################
+# libraries:
+import multiprocessing
+from array import array
+from itertools import islice, groupby
+from operator import itemgetter
+
+from cigar import exact_cigar
+from encoding import encode_read, reverse_complement
+from sam import SamWriter, FORMATTERS, SECONDARY, REVERSE
+from approx import approx_search
+from longread import seed_extend
+from stats import timed
+
+################################################################
+# Functions:
+
+def search_many(index, reads, max_hits=None):
+    '''Search all reads in index. Identical reads are searched once, in
+    sorted order so an index with search_sorted() can share the traversal
+    of common prefixes. Returns two arrays (read_idx, positions): the hits
+    of reads[k] are the positions where read_idx is k, in input order.
+    With max_hits, at most that many hits are returned per read.
+
+    Example:
+    index = SuffixArray('mississippi')
+    read_idx, positions = search_many(index, ['ssi', 'x', 'ssi'])
+    print(list(read_idx), sorted(positions[:2]))
+    #>>> [0, 0, 2, 2] [2, 5]
+    '''
+    reads = list(reads)
+    unique = sorted(set(reads))
+    if hasattr(index, 'search_sorted'):
+        results = index.search_sorted(unique, max_hits)
+    else:
+        results = (index.search(read, max_hits) for read in unique)
+    found = {}
+    for read, hits in zip(unique, results):
+        if len(hits) > 0:
+            found[read] = array('l', hits)
+
+    read_idx = array('l')
+    positions = array('l')
+    for k, read in enumerate(reads):
+        hits = found.get(read)
+        if hits != None:
+            read_idx.extend(array('l', [k]) * len(hits))
+            positions.extend(hits)
+    return read_idx, positions
+
+
+def chunk_hits(genome, reads, edits=0, min_seed=0, cache=None, max_hits=None):
+    '''Yields (k, position in genome.text, cigar, reference length) for the
+    hits of reads[k]; exact matches if edits is 0, otherwise matches with at
+    most edits edits. With min_seed > 0 reads are mapped by seed-and-extend
+    with seeds of at least min_seed letters. Both need the tree backend.
+    With a cache (cache.HitCache), reads found there are not searched again.
+    max_hits caps the exact hits per read (see search_many).'''
+    if genome.encoded:
+        reads = [encode_read(read) for read in reads]
+    if cache is None:
+        yield from _search_hits(genome, reads, edits, min_seed, max_hits)
+        return
+    results = [cache.get(read) for read in reads]
+    missing = sorted(set(read for read, hits in zip(reads, results) if hits is None))
+    if missing:
+        found = [[] for _ in missing]
+        for i, position, cigar, span in _search_hits(genome, missing, edits, min_seed, max_hits):
+            found[i].append((position, cigar, span))
+        found = dict(zip(missing, found))
+        for read, hits in found.items():
+            cache.put(read, hits)
+        results = [found[read] if hits is None else hits for read, hits in zip(reads, results)]
+    for k, hits in enumerate(results):
+        for position, cigar, span in hits:
+            yield k, position, cigar, span
+
+
+def _search_hits(genome, reads, edits, min_seed, max_hits=None):
+    # chunk_hits of encoded reads, without the cache.
+    if min_seed > 0:
+        for k, read in enumerate(reads):
+            for position, cigar, span in seed_extend(genome.index, read, min_seed):
+                yield k, position, cigar, span
+        return
+    if edits == 0:
+        read_idx, positions = search_many(genome.index, reads, max_hits)
+        for k, position in zip(read_idx, positions):
+            m = len(reads[k])
+            yield k, position, exact_cigar(m), m
+        return
+    found = {}
+    for k, read in enumerate(reads):
+        if read not in found:
+            found[read] = approx_search(genome.index, read, edits)
+        for position, cigar, span in found[read]:
+            yield k, position, cigar, span
+
+
+def strand_queries(reads):
+    '''Read k and its reverse complement as queries 2k and 2k+1. The reverse
+    complement of a palindromic read is left out (''), so its hits are not
+    reported twice.'''
+    queries = []
+    for read in reads:
+        rc = reverse_complement(read)
+        queries.append(read)
+        queries.append(rc if rc != read else '')
+    return queries
+
+
+def count_hits(genome, read):
+    '''Number of exact occurrences of read in genome, without enumerating
+    them (from the size of its leaf or suffix array interval).'''
+    return genome.index.count(encode_read(read) if genome.encoded else read)
+
+
+def chunk_counts(genome, chunk, edits=0, min_seed=0, both_strands=False, cache=None, timings=None):
+    '''Returns 'name<TAB>number of hits' lines for a list of FASTQ records
+    and the sum of the numbers. Exact hits are counted with count_hits;
+    approximate and seed-and-extend hits are enumerated and counted.
+    timings as for chunk_records.'''
+    timings = {} if timings is None else timings
+    reads = [fq_rec[1] for fq_rec in chunk]
+    queries = strand_queries(reads) if both_strands else reads
+    counts = [0] * len(queries)
+    with timed(timings, 'search'):
+        if edits == 0 and min_seed == 0:
+            found = {}
+            for q, query in enumerate(queries):
+                if query not in found:
+                    found[query] = count_hits(genome, query)
+                counts[q] = found[query]
+        else:
+            for q, _, _, _ in chunk_hits(genome, queries, edits, min_seed, cache):
+                counts[q] += 1
+    with timed(timings, 'report'):
+        if both_strands:
+            counts = [counts[2*k] + counts[2*k+1] for k in range(len(reads))]
+        lines = ['{}\t{}\n'.format(fq_rec[0], count) for fq_rec, count in zip(chunk, counts)]
+    return lines, sum(counts)
+
+
+def chunk_records(genome, chunk, fmt='simple', edits=0, min_seed=0, both_strands=False, cache=None,
+                  max_hits=None, count_only=False, timings=None):
+    '''Returns the list of records (see sam.FORMATTERS) of all hits of a
+    list of FASTQ records. With both_strands, the reverse complement of
+    every read is searched in the same batch, and its hits are reported
+    with flag REVERSE and the reverse complemented sequence and quality.
+    cache is passed on to chunk_hits.
+
+    With max_hits, at most that many hits are reported per read and
+    strand, each with the SAM tag X0:i:<total number of hits of the read,
+    on both strands with both_strands>; exact hits beyond max_hits are
+    counted (count_hits), never enumerated. With count_only, the lines of
+    chunk_counts are returned instead.
+
+    The seconds spent searching the reads and reporting their hits are
+    added to timings['search'] and timings['report'] (a dict), if given.'''
+    if count_only:
+        return chunk_counts(genome, chunk, edits, min_seed, both_strands, cache, timings)[0]
+    timings = {} if timings is None else timings
+    format_record = FORMATTERS[fmt]
+    records = []
+    previous = -1
+    reads = [fq_rec[1] for fq_rec in chunk]
+    if both_strands:
+        reads = strand_queries(reads)
+    tags = ''
+    with timed(timings, 'search'):
+        hits = chunk_hits(genome, reads, edits, min_seed, cache, max_hits)
+        groups = [(q, list(group)) for q, group in groupby(hits, key=itemgetter(0))]
+        if max_hits is not None:
+            totals = {}  # read -> total number of hits (of both strands).
+            for q, group in groups:
+                total = len(group)
+                if total >= max_hits and edits == 0 and min_seed == 0:
+                    total = count_hits(genome, reads[q])
+                k = q // 2 if both_strands else q
+                totals[k] = totals.get(k, 0) + total
+    with timed(timings, 'report'):
+        for q, group in groups:
+            k, reverse = divmod(q, 2) if both_strands else (q, 0)
+            if max_hits is not None:
+                group = group[:max_hits]
+                tags = 'X0:i:{}'.format(totals[k])
+            fq_rec = chunk[k]
+            seq = fq_rec[1]
+            quality = fq_rec[2] if len(fq_rec) > 2 else ''
+            if reverse:
+                seq, quality = reverse_complement(seq), quality[::-1]
+            for _, position, cigar, span in group:
+                record, match = genome.locate(position)
+                if match + span > genome.lengths[record]:
+                    continue  # spans two records.
+                flag = SECONDARY if k == previous else 0
+                previous = k
+                if reverse:
+                    flag |= REVERSE
+                records.append(format_record(fq_rec[0], flag, record, genome.names[record], match,
+                                             cigar, seq, quality, tags))
+    return records
+
+
+def sam_chunk(genome, chunk, fmt='simple', edits=0, min_seed=0, both_strands=False, max_hits=None,
+              count_only=False):
+    '''Returns the records of all hits of a list of FASTQ records, as one
+    str (bytes for the binary format).'''
+    records = chunk_records(genome, chunk, fmt, edits, min_seed, both_strands, None, max_hits, count_only)
+    return (b'' if fmt == 'binary' else '').join(records)
+
+
+def chunks(iterable, size):
+    '''Split an iterable into lists of at most size elements.'''
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+# genome (and cache) for the worker processes, set before forking so the
+# workers inherit them instead of receiving a pickled copy. Every worker
+# fills its own copy of the cache.
+_worker_genome = None
+_worker_cache = None
+
+
+def _chunk_output(genome, chunk, cache, options, timings):
+    # the records of a chunk and its number of hits: the records, or the
+    # sum of the counts with count_only.
+    if options['count_only']:
+        return chunk_counts(genome, chunk, options['edits'], options['min_seed'], options['both_strands'], cache,
+                            timings)
+    records = chunk_records(genome, chunk, cache=cache, timings=timings, **options)
+    return records, len(records)
+
+
+def _map_chunk(task):
+    chunk, options = task
+    cache = _worker_cache
+    timings = {}
+    before = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    records, hits = _chunk_output(_worker_genome, chunk, cache, options, timings)
+    after = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    with timed(timings, 'write'):
+        text = (b'' if options['fmt'] == 'binary' else '').join(records)
+    return len(chunk), hits, after[0] - before[0], after[1] - before[1], timings, text
+
+
+def map_reads(genome, fastq_recs, out=None, threads=1, ordered=True, chunk_size=1000,
+              fmt='simple', command_line=None, edits=0, min_seed=0, both_strands=False, cache=None,
+              max_hits=None, count_only=False, timings=None):
+    '''Search every read in genome and write the hits in format fmt (see
+    sam.py) to out (default stdout), with a header for formats that have
+    one. fastq_recs is only iterated once, so it can be a stream. With
+    edits > 0, reads are matched with up to that many edits, and with
+    min_seed > 0 by seed-and-extend (both need the tree backend). With
+    both_strands, reverse complement hits are reported too (SAM flag 16).
+    With a cache (cache.HitCache), repeated reads are looked up there; with
+    threads > 1 every worker has its own copy and their hit and miss counts
+    are added to cache.hits and cache.misses. max_hits caps the hits
+    reported per read and count_only writes the number of hits of every
+    read instead of the hits (see chunk_records).
+
+    The seconds spent searching, reporting the hits (chunk_records) and
+    joining and writing the output are added to timings['search'],
+    timings['report'] and timings['write'] (a dict), if given, summed over
+    the chunks and worker processes.
+
+    Reads are mapped chunk_size at a time. With threads > 1, the chunks are
+    sent to a pool of forked worker processes. If ordered, output is in input order, otherwise
+    chunks are written as soon as they are done.
+
+    Returns the number of reads and of hits written (with count_only, the
+    sum of the counts).
+    '''
+    global _worker_genome, _worker_cache
+    options = dict(fmt=fmt, edits=edits, min_seed=min_seed, both_strands=both_strands, max_hits=max_hits,
+                   count_only=count_only)
+    writer = SamWriter(out, 'simple' if count_only else fmt)
+    if not count_only:
+        writer.write_header(genome.names, genome.lengths, command_line)
+    timings = {} if timings is None else timings
+    n_reads = n_hits = 0
+    if threads <= 1:
+        for chunk in chunks(fastq_recs, chunk_size):
+            records, hits = _chunk_output(genome, chunk, cache, options, timings)
+            n_reads += len(chunk)
+            n_hits += hits
+            with timed(timings, 'write'):
+                writer.write((b'' if fmt == 'binary' else '').join(records))
+        with timed(timings, 'write'):
+            writer.flush()
+        return n_reads, n_hits
+
+    _worker_genome = genome
+    _worker_cache = cache
+    try:
+        with multiprocessing.get_context('fork').Pool(threads) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            tasks = ((chunk, options) for chunk in chunks(fastq_recs, chunk_size))
+            for done_reads, done_hits, cache_hits, cache_misses, done_timings, text in imap(_map_chunk, tasks):
+                n_reads += done_reads
+                n_hits += done_hits
+                if cache is not None:
+                    cache.hits += cache_hits
+                    cache.misses += cache_misses
+                for name, seconds in done_timings.items():
+                    timings[name] = timings.get(name, 0) + seconds
+                with timed(timings, 'write'):
+                    writer.write(text)
+    finally:
+        _worker_genome = None
+        _worker_cache = None
+        writer.flush()
+    return n_reads, n_hits
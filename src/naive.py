@@ -1,4 +1,10 @@
-"""Implementation of the naive exact matching algorithm."""
+"""Implementation of the naive exact matching algorithm.
+
+naive_algorithm and scan_search compare letters exactly (case-sensitive),
+as the indexes do, so either can check them. The command line (main
+below) upper-cases the reference and the reads first, so lowercase
+(soft-masked) bases still match.
+"""
 
 ################################################################
 # libraries:
@@ -7,23 +13,16 @@ import sys
 ################################################################
 # Functions:
 
-from align import get_edits
-from cigar import edits_to_cigar    
+from cigar import exact_cigar
+from seqio import read_fastq
 
 def naive_algorithm(ref:str, read:str):
     if ref == '' or ref == None:
         return []
     if read == '' or read == None:
         return []
-    ref=ref.strip().upper()
-    read=read.strip().upper()
     if len(read) > len(ref):
-        return False
-    if len(read) == len(ref):
-        return False
-    
-    ref=ref.strip().upper()
-    read=read.strip().upper()
+        return []
     match_positions = []
     for idx in range(len(ref)-len(read)+1):
         substring = ref[idx:idx+len(read)]
@@ -36,6 +35,52 @@ def naive_algorithm(ref:str, read:str):
     return match_positions
 
 
+def scan_search(ref, read, max_hits=None):
+    '''All start positions of read in ref (str or bytes), overlapping ones
+    included. Each step is a str/bytes find, which runs in C (a two-way /
+    memchr search), so this is a fast baseline for cross-checking the
+    indexes on large references and for references too small to be worth
+    indexing. With max_hits, stops after that many.
+
+    Example:
+    print(scan_search('aaaa', 'aa'))
+    #>>> [0, 1, 2]
+    '''
+    if not read or not ref:
+        return []
+    positions = []
+    i = ref.find(read)
+    while i != -1 and len(positions) != max_hits:
+        positions.append(i)
+        i = ref.find(read, i + 1)
+    return positions
+
+
+################################################################
+# Classes:
+
+class ScanIndex(object):
+    '''No index at all: search(read) scans the whole reference with
+    scan_search. Same interface as the st.py backends; building is free,
+    searching is O(n) per read.'''
+    def __init__(self, string):
+        self.string = string
+
+    def __len__(self):
+        return len(self.string)
+
+    def search(self, read, max_hits=None):
+        if isinstance(read, str) and not isinstance(self.string, str):
+            read = read.encode()
+        return scan_search(self.string, read, max_hits)
+
+    def count(self, read):
+        return len(self.search(read))
+
+
+################################################################
+# Functions:
+
 def read_fasta():
     # load input:
     inFile = sys.argv[1]
@@ -57,41 +102,21 @@ def read_fasta():
     return record_list
 
 
-def read_fastq():
-    inFile = sys.argv[2]  
-    with open(inFile,'r') as f:
-        lines = f.readlines()
-    record_list = []
-    header = ''
-    sequence = []
-    for line in lines:
-        line = line.strip()
-        if line.startswith('@'):
-            if header != "":
-                record_list.append([header.strip(), ''.join(sequence).strip()])
-                sequence = []
-            header = line[1:]
-        else:
-            sequence.append(line)
-    record_list.append([header.strip(), ''.join(sequence).strip()])
-    return record_list
-
 ################################################################
 # Code:
     
 if __name__ == '__main__':
     
     fasta_recs = read_fasta()
-    fastq_recs = read_fastq()
+    fastq_recs = read_fastq(sys.argv[2])
     
     for fq_rec in fastq_recs:
         for fa_rec in fasta_recs:
-            matches = naive_algorithm(fa_rec[1], fq_rec[1])
+            matches = scan_search(fa_rec[1].upper(), fq_rec[1].upper())
             for match in matches:
                 read_name = fq_rec[0]
                 read_seq = fq_rec[1]
-                edits = get_edits(read_seq, fa_rec[1][match:match+len(fq_rec[1])])
-                cigar = edits_to_cigar(edits[2])
+                cigar = exact_cigar(len(read_seq))
                 output = [read_name,fa_rec[0],str(match+1),cigar,read_seq]
                 print('\t'.join(output))
         
@@ -0,0 +1,117 @@
+"""Choosing the search backend for a run of st (--backend auto).
+
+The cost of each backend is estimated from the reference length n, the
+(estimated) number of reads and the worker processes, with constants
+measured on random DNA (src/benchmark.py construction/search):
+
+    backend   build          per read             peak memory
+    scan      0              5 us + 2.5 ns * n    1 byte * n (the text)
+    tree      13 us * n      17 us                620 bytes * n
+    compact   8 us * n       15 us                56 bytes * n
+    sa        11 us * n      20 us                240 bytes * n
+
+The fastest backend whose peak memory fits in the available memory is
+chosen (the smallest one if none fits). Approximate matching and
+seed-and-extend need the tree. The estimates are rough; they only have
+to rank the backends, and --backend overrides the choice.
+"""
+
+################################################################
+# libraries:
+import os
+from collections import namedtuple
+
+from seqio import open_text
+
+################################################################
+# Constants:
+
+# backend -> (build seconds per letter, seconds per read, seconds per read
+# and letter, peak bytes per letter)
+COSTS = {
+    'scan': (0.0, 5e-6, 2.5e-9, 1),
+    'tree': (13e-6, 17e-6, 0.0, 620),
+    'compact': (8e-6, 15e-6, 0.0, 56),
+    'sa': (11e-6, 20e-6, 0.0, 240),
+}
+MEMORY_FRACTION = 0.8  # of the available memory an index may use.
+GZIP_RATIO = 3.5  # rough compression ratio of FASTQ files.
+
+Plan = namedtuple('Plan', ['backend', 'seconds', 'memory', 'reason'])
+
+################################################################
+# Functions:
+
+def available_memory():
+    '''Bytes of memory available to this process (MemAvailable on Linux),
+    None if unknown.'''
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_reads(path, sample=100):
+    '''Estimated number of reads in a FASTQ file: the file size divided by
+    the average size of its first records (uncompressed size guessed with
+    GZIP_RATIO for gzip files).'''
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, 'rb') as f:
+        if f.read(2) == b'\x1f\x8b':
+            size *= GZIP_RATIO
+    with open_text(path) as f:
+        lines = [line for _, line in zip(range(4 * sample), f)]
+    if not lines:
+        return 0
+    # records have 4 lines, or 2 without the '+' and quality lines.
+    per_record = 4 if len(lines) > 2 and lines[2].startswith('+') else 2
+    records = max(len(lines) // per_record, 1)
+    return max(1, int(size / (sum(len(line) for line in lines) / records)))
+
+
+def estimate(backend, reference_length, reads, threads=1):
+    '''(seconds, peak bytes) of building backend over reference_length
+    letters and searching reads reads with threads processes.'''
+    build, per_read, per_read_letter, per_letter = COSTS[backend]
+    search = reads * (per_read + per_read_letter * reference_length) / max(threads, 1)
+    return build * reference_length + search, per_letter * reference_length
+
+
+def plan(reference_length, reads, threads=1, available=None, need_tree=False):
+    '''Choose a backend. Returns a Plan(backend, estimated seconds, estimated
+    peak bytes, reason).
+
+    Example:
+    print(plan(100, 1).backend, plan(10**6, 10**5).backend)
+    #>>> scan compact
+    '''
+    if need_tree:
+        seconds, memory = estimate('tree', reference_length, reads, threads)
+        return Plan('tree', seconds, memory, 'needed for -d/--edits and --seed-extend')
+    estimates = [(estimate(backend, reference_length, reads, threads), backend) for backend in COSTS]
+    limit = None if available is None else available * MEMORY_FRACTION
+    fitting = [e for e in estimates if limit is None or e[0][1] <= limit]
+    if fitting:
+        (seconds, memory), backend = min(fitting)
+        reason = 'fastest estimate' + ('' if len(fitting) == len(estimates) else ' that fits in memory')
+    else:
+        (seconds, memory), backend = min(estimates, key=lambda e: e[0][1])
+        reason = 'smallest, nothing fits in memory'
+    return Plan(backend, seconds, memory, reason)
+
+
+def describe(plan, reference_length, reads, available):
+    '''The log line for a plan.'''
+    memory = 'unknown' if available is None else '{:.1f} GB'.format(available / 1e9)
+    return ('st: using the {} backend ({}; reference {} letters, ~{} reads, {} available memory, '
+            'estimated {:.2f} s and {:.0f} MB)'.format(plan.backend, plan.reason, reference_length, reads,
+                                                       memory, plan.seconds, plan.memory / 1e6))
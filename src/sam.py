@@ -0,0 +1,140 @@
+"""Writing mapping results.
+
+Three output formats:
+
+    simple  the 5 column format of the course tools (QNAME, RNAME, POS,
+            CIGAR, SEQ), no header. The default, as the gsa-test reference
+            tools compare against it.
+    sam     full 11 column SAM with @HD, @SQ (one per FASTA record) and
+            @PG header lines, plus the X0 tag (total number of hits of
+            the read, both strands added up) with --max-hits.
+    binary  a compact binary record stream (see BINARY_RECORD) for
+            downstream tools, read back with read_binary().
+
+Hits are formatted into str/bytes records (in the worker processes when
+mapping in parallel) and SamWriter collects them and writes in large
+blocks instead of one print per line.
+"""
+
+################################################################
+# libraries:
+import sys
+import struct
+
+################################################################
+# Constants:
+
+FORMATS = ['simple', 'sam', 'binary']
+SECONDARY = 256  # SAM flag for all but the first reported hit of a read.
+REVERSE = 16  # SAM flag for hits of the reverse complement (SEQ is reverse complemented).
+
+BINARY_MAGIC = b'STHITS\x01\0'
+# name length, reference id, 0-based position, flag, cigar length,
+# sequence length, has quality; followed by name, cigar, sequence and,
+# if has quality is 1, sequence length bytes of quality.
+BINARY_RECORD = struct.Struct('<HiqHHIB')
+BINARY_REFERENCE = struct.Struct('<Hq')  # name length, sequence length.
+
+################################################################
+# Functions:
+
+def simple_record(qname, flag, ref_id, rname, pos, cigar, seq, qual, tags=''):
+    return '\t'.join([qname, rname, str(pos+1), cigar, seq]) + '\n'
+
+
+def sam_record(qname, flag, ref_id, rname, pos, cigar, seq, qual, tags=''):
+    # SAM names end at the first white space; tags are optional TAG:TYPE:VALUE fields.
+    return '\t'.join([qname.split()[0], str(flag), rname.split()[0], str(pos+1), '255', cigar,
+                      '*', '0', '0', seq, qual or '*'] + ([tags] if tags else [])) + '\n'
+
+
+def binary_record(qname, flag, ref_id, rname, pos, cigar, seq, qual, tags=''):
+    qname, cigar, seq, qual = qname.encode(), cigar.encode(), seq.encode(), qual.encode()
+    return BINARY_RECORD.pack(len(qname), ref_id, pos, flag, len(cigar), len(seq),
+                              1 if qual else 0) + qname + cigar + seq + qual
+
+
+FORMATTERS = {'simple': simple_record, 'sam': sam_record, 'binary': binary_record}
+
+
+def sam_header(names, lengths, command_line=None):
+    lines = ['@HD\tVN:1.6\tSO:unsorted\n']
+    for name, length in zip(names, lengths):
+        lines.append('@SQ\tSN:{}\tLN:{}\n'.format(name.split()[0], length))
+    lines.append('@PG\tID:st\tPN:st' + ('\tCL:' + command_line if command_line else '') + '\n')
+    return ''.join(lines)
+
+
+def binary_header(names, lengths):
+    parts = [BINARY_MAGIC, struct.pack('<I', len(names))]
+    for name, length in zip(names, lengths):
+        name = name.encode()
+        parts.append(BINARY_REFERENCE.pack(len(name), length) + name)
+    return b''.join(parts)
+
+
+def read_binary(f):
+    '''Read a binary hit stream from a binary file object. Returns the
+    reference names and lengths and a generator over the records as
+    (qname, flag, rname, 0-based pos, cigar, seq, qual) tuples.'''
+    if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError('not an st binary hit stream')
+    count, = struct.unpack('<I', f.read(4))
+    names, lengths = [], []
+    for _ in range(count):
+        name_length, length = BINARY_REFERENCE.unpack(f.read(BINARY_REFERENCE.size))
+        names.append(f.read(name_length).decode())
+        lengths.append(length)
+
+    def records():
+        while True:
+            fixed = f.read(BINARY_RECORD.size)
+            if not fixed:
+                return
+            name_length, ref_id, pos, flag, cigar_length, seq_length, has_qual = BINARY_RECORD.unpack(fixed)
+            qname = f.read(name_length).decode()
+            cigar = f.read(cigar_length).decode()
+            seq = f.read(seq_length).decode()
+            qual = f.read(seq_length).decode() if has_qual else ''
+            yield qname, flag, names[ref_id], pos, cigar, seq, qual
+
+    return names, lengths, records()
+
+
+################################################################
+# Classes:
+
+class SamWriter(object):
+    def __init__(self, out=None, fmt='simple', buffer_size=1 << 20):
+        ''' Buffered writer of formatted records to out (a text stream, or a
+        binary stream for the binary format; default stdout).'''
+        out = sys.stdout if out is None else out
+        self.binary = fmt == 'binary'
+        if self.binary:
+            out = getattr(out, 'buffer', out)
+        self.out = out
+        self.fmt = fmt
+        self.format_record = FORMATTERS[fmt]
+        self.buffer_size = buffer_size
+        self._pieces = []
+        self._size = 0
+
+    def write_header(self, names, lengths, command_line=None):
+        if self.fmt == 'sam':
+            self.write(sam_header(names, lengths, command_line))
+        elif self.binary:
+            self.write(binary_header(names, lengths))
+
+    def write(self, data):
+        '''Add formatted records (str, or bytes for binary) to the buffer.'''
+        self._pieces.append(data)
+        self._size += len(data)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._pieces:
+            self.out.write((b'' if self.binary else '').join(self._pieces))
+            self._pieces = []
+            self._size = 0
+        self.out.flush()
@@ -0,0 +1,270 @@
+"""Streaming readers for sequence files."""
+
+################################################################
+# libraries:
+import os
+import gzip
+import mmap
+from collections import namedtuple
+
+################################################################
+# Constants:
+
+WHITESPACE = b' \t\r\n'
+BLOCK_SIZE = 1 << 24  # bytes scanned at a time when indexing a FASTA file.
+
+# one line of a samtools .fai file: record name (first word of the header),
+# number of bases, byte offset of the first base, bases per line and bytes
+# per line (including the line break).
+FaiRecord = namedtuple('FaiRecord', ['name', 'length', 'offset', 'line_bases', 'line_width'])
+
+################################################################
+# Functions:
+
+def open_text(inFile):
+    '''Open a (possibly gzip compressed) text file for reading.'''
+    with open(inFile, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        return gzip.open(inFile, 'rt')
+    return open(inFile, 'r')
+
+
+def read_fastq(inFile):
+    '''Generator over the records of a FASTQ file (plain or gzip), yielding
+    (name, sequence, quality) one record at a time.
+    Handles 4-line records ('@name', sequence, '+', quality), sequence and
+    quality wrapped over several lines, and records without the '+' and
+    quality lines (as written by simulate_simple_fastq.py), where quality
+    is ''. Only the current record is held in memory.
+
+    Example:
+    for name, seq, qual in read_fastq('data_for_testing/mississippi.fq'):
+        print(name, seq)
+    #>>> read1 iss
+    #>>> ...
+    '''
+    with open_text(inFile) as f:
+        line = f.readline()
+        while line:
+            line = line.strip()
+            if line == '':
+                line = f.readline()
+                continue
+            if not line.startswith('@'):
+                raise ValueError('{}: expected a FASTQ header, got {!r}'.format(inFile, line[:50]))
+            name = line[1:].strip()
+            sequence = []
+            line = f.readline()
+            while line and not line.startswith('@') and not line.startswith('+'):
+                sequence.append(line.strip())
+                line = f.readline()
+            sequence = ''.join(sequence)
+            quality = ''
+            if line.startswith('+'):
+                # quality lines may start with '@', so read until it is as long as the sequence.
+                quality = []
+                length = 0
+                line = f.readline()
+                while line and length < len(sequence):
+                    part = line.strip()
+                    quality.append(part)
+                    length += len(part)
+                    line = f.readline()
+                quality = ''.join(quality)
+            yield name, sequence, quality
+
+
+def read_fai(path):
+    with open(path) as f:
+        return [FaiRecord(name, int(length), int(offset), int(line_bases), int(line_width))
+                for name, length, offset, line_bases, line_width
+                in (line.rstrip('\n').split('\t')[:5] for line in f if line.strip())]
+
+
+def write_fai(path, records):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write('\t'.join(str(value) for value in record) + '\n')
+
+
+################################################################
+# Classes:
+
+class FastaFile(object):
+    def __init__(self, path, save_fai=False):
+        ''' Memory-mapped FASTA file with a .fai offset index.
+
+        The index (record lengths and where their bases start) is read from
+        path + '.fai' if it is newer than the FASTA file and agrees with it
+        (every header is where the index puts it and the last record ends
+        at the end of the file), otherwise the file is scanned once and, if
+        save_fai is True and the lines of every record have equal length
+        (as samtools requires), the index is written there.
+        Sequences are only read from the mapping when asked for, so opening
+        a multi-gigabyte genome holds no sequence in memory, and fetch()
+        reads any region of a record in O(region) time.
+
+        Example:
+        fasta = FastaFile('data_for_testing/mississippi.fa')
+        print(fasta.names, fasta.fetch(0, 2, 6))
+        #>>> ['chr1', 'chr2'] b'ssis'
+        '''
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(2) == b'\x1f\x8b':
+                raise ValueError('{}: gzip compressed FASTA files cannot be memory-mapped'.format(path))
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b''
+        fai_path = path + '.fai'
+        if not (os.path.exists(fai_path) and os.path.getmtime(fai_path) >= os.path.getmtime(path)
+                and self._load_fai(fai_path)):
+            self._scan()
+            if save_fai and all(record.line_bases > 0 for record in self.fai if record.length > 0):
+                try:
+                    write_fai(fai_path, self.fai)
+                except OSError:
+                    pass  # e.g. a read-only directory; the index is just not saved.
+        self._numbers = {}
+        for k, name in enumerate(self.names):
+            self._numbers.setdefault(name, k)
+            self._numbers.setdefault(self.fai[k].name, k)
+
+    def __len__(self):
+        return len(self.fai)
+
+    @property
+    def lengths(self):
+        return [record.length for record in self.fai]
+
+    def _load_fai(self, fai_path):
+        # use the index at fai_path if it matches the file, which can have
+        # been replaced by an older one (mv, cp -p) since it was written.
+        try:
+            fai = read_fai(fai_path)
+        except (OSError, ValueError, IndexError):
+            return False
+        mm = self._mm
+        size = len(mm)
+        self.fai = fai
+        self._ends = [self._byte(k, record.length, True) for k, record in enumerate(fai)]
+        if fai and self._ends[-1] != size:
+            last = fai[-1]
+            if self._ends[-1] - (last.line_width - last.line_bases) != size:
+                return False
+            self._ends[-1] = size  # no line break at the end of the file.
+        self.names = []
+        for k, record in enumerate(fai):
+            if not 0 < record.offset <= size or self._ends[k] > size:
+                return False
+            start = mm.rfind(b'\n', 0, max(record.offset - 1, 0)) + 1
+            name = self._header(record.offset)
+            if mm[start:start+1] != b'>' or (name.split() or [name])[0] != record.name:
+                return False
+            if k > 0 and start != self._ends[k-1]:
+                return False
+            self.names.append(name)
+        return bool(fai) or size == 0
+
+    def _header(self, offset):
+        # the header line ends right before the first base of its record.
+        start = self._mm.rfind(b'\n', 0, max(offset - 1, 0)) + 1
+        return self._mm[start+1:max(offset - 1, start + 1)].decode('ascii', 'replace').strip()
+
+    def _scan(self):
+        mm = self._mm
+        size = len(mm)
+        self.fai, self.names, self._ends = [], [], []
+        position = 0 if mm[:1] == b'>' else mm.find(b'\n>') + 1 or size
+        while position < size:
+            header_end = mm.find(b'\n', position)
+            if header_end == -1:
+                header_end = size
+            offset = min(header_end + 1, size)
+            next_header = mm.find(b'\n>', offset - 1)
+            end = size if next_header == -1 else next_header + 1
+            self.names.append(mm[position+1:header_end].decode('ascii', 'replace').strip())
+            self._ends.append(end)
+            self.fai.append(self._fai_record(self.names[-1], offset, end))
+            position = end
+
+    def _fai_record(self, name, offset, end):
+        mm = self._mm
+        length = newlines = 0
+        for block in range(offset, end, BLOCK_SIZE):
+            block = mm[block:min(block + BLOCK_SIZE, end)]
+            length += len(block.translate(None, WHITESPACE))
+            newlines += block.count(b'\n')
+        first_line = mm.find(b'\n', offset, end)
+        line_end = end if first_line == -1 else first_line + 1
+        line_width = line_end - offset
+        line_bases = len(mm[offset:line_end].translate(None, WHITESPACE))
+        fai_name = name.split()[0] if name.split() else name
+        record = FaiRecord(fai_name, length, offset, line_bases, line_width)
+        if length > 0 and not self._even_lines(record, end, newlines):
+            record = record._replace(line_bases=0, line_width=0)
+        return record
+
+    def _even_lines(self, record, end, newlines):
+        # every line but the last has line_bases bases and ends exactly at
+        # line_width, as the offset arithmetic of fetch() assumes.
+        if record.line_bases == 0:
+            return False
+        lines = -(-record.length // record.line_bases)
+        expected = self._byte_of(record, record.length, True)
+        if end == expected:
+            breaks = lines
+        elif end == len(self._mm) and end == expected - (record.line_width - record.line_bases):
+            breaks = lines - 1  # no line break at the end of the file.
+        else:
+            return False
+        last_break = record.offset + (lines - 1) * record.line_width - 1
+        at_breaks = memoryview(self._mm)[record.offset + record.line_width - 1:last_break + 1:record.line_width]
+        return newlines == breaks and bytes(at_breaks).count(b'\n') == lines - 1
+
+    @staticmethod
+    def _byte_of(record, i, end=False):
+        # byte offset of base i of record; with end, of the end of the record
+        # if i is its length (after the line break of the last line).
+        if record.line_bases == 0:
+            return record.offset
+        line, column = divmod(i, record.line_bases)
+        if end and column > 0:
+            return record.offset + line * record.line_width + record.line_width - record.line_bases + column
+        return record.offset + line * record.line_width + column
+
+    def _byte(self, k, i, end=False):
+        return self._byte_of(self.fai[k], i, end)
+
+    def number(self, name):
+        '''Record number of a name (full header or its first word).'''
+        return self._numbers[name]
+
+    def sequence(self, k, table=None):
+        '''The bases of record k (a number or name) as bytes, translated
+        with table (a bytes.translate table, e.g.
+        encoding.REFERENCE_TABLE) in the same pass that drops the line
+        breaks.'''
+        k = self.number(k) if isinstance(k, str) else k
+        return self._mm[self.fai[k].offset:self._ends[k]].translate(table, WHITESPACE)
+
+    def fetch(self, k, start, end, table=None):
+        '''Bases start to end (0-based, end exclusive) of record k (a number or
+        name) as bytes, read straight from the mapping.'''
+        k = self.number(k) if isinstance(k, str) else k
+        record = self.fai[k]
+        start, end = max(0, start), min(end, record.length)
+        if start >= end:
+            return b''
+        if record.line_bases == 0:  # uneven lines, no offset arithmetic.
+            return self.sequence(k, table)[start:end]
+        return self._mm[self._byte(k, start):self._byte(k, end)].translate(table, WHITESPACE)
+
+    def records(self, table=None):
+        '''Yields [name, sequence] for each record, reading one record at a
+        time: bytes translated with table if it is given, otherwise str.'''
+        for k, name in enumerate(self.names):
+            if table is None:
+                yield [name, self.sequence(k).decode('ascii', 'replace')]
+            else:
+                yield [name, self.sequence(k, table)]
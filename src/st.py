@@ -5,9 +5,22 @@
 # Libraries
 
 import sys
+import argparse
+from array import array
 from collections import deque
-from cigar import edits_to_cigar
-from align import get_edits
+from compact_st import CompactSuffixTree
+from chunked import build_chunked, progress_printer
+from sa import SuffixArray
+from naive import ScanIndex
+from seqio import read_fastq, FastaFile
+from index_io import write_index, append_records, MappedIndex, INDEX_TYPES
+from mapper import map_reads
+from generalized import GeneralizedIndex
+from sam import FORMATS
+from stats import RunStats, count_nodes, profiled
+from cache import HitCache, parse_size
+from encoding import REFERENCE_TABLE
+import planner
 
 #############################################
 # Classes
@@ -18,6 +31,140 @@ class Node(object):
         self.end = end  # end_index of node (with respect to ref-string position).
         self.out = {}  # dict containing children of node (named character corresponfing to start_index)
         self.suffix_order_leaf = suffix_order_leaf  # order of longest suffixes (longest=0)
+        self.leaf_lo = None  # leaves below node are leaf_array[leaf_lo:leaf_hi] (set by leaf_intervals).
+        self.leaf_hi = None
+
+
+class SuffixTreeIndex(object):
+    '''Node() suffix tree over ref with the search(read) interface shared by
+    the other backends (CompactSuffixTree, SuffixArray).'''
+    def __init__(self, ref, builder=None):
+        self.ref = ref
+        self.tree = (builder or SuffixTree)(ref)
+        self.leaf_array = leaf_intervals(self.tree)
+
+    def insert(self, *texts):
+        '''Append each text (a separator and a new record, e.g. '#ACGT') to
+        ref and add the suffixes starting in the new records to the tree,
+        each walked from the root as in SuffixTree(). The existing nodes
+        are kept, so adding the suffixes costs time proportional to the
+        new texts, but numbering the leaves again is one pass over the
+        whole tree. The old sentinel position becomes the first letter of
+        the first text. Reads never contain the separator or the sentinel,
+        so each suffix is compared only up to the end of its record and
+        ends in a leaf of its own, keyed ('$', suffix).
+
+        Example:
+        index = SuffixTreeIndex('ACGT')
+        index.insert('#CGA')
+        print(sorted(index.search('CG')))
+        #>>> [1, 5]
+        '''
+        begin = len(self.ref)
+        self.ref = self.ref + texts[0][:0].join(texts)
+        for text in texts:
+            self._add_suffixes(begin + 1, begin + len(text))
+            begin += len(text)
+        stack = [self.tree]
+        while stack:  # leaf_intervals() numbers nodes without leaf_lo.
+            node = stack.pop()
+            node.leaf_lo = node.leaf_hi = None
+            stack.extend(node.out.values())
+        self.leaf_array = leaf_intervals(self.tree)
+
+    def _add_suffixes(self, first, stop):
+        # the suffixes first..stop-1, compared up to stop.
+        ref = self.ref
+        string_length = len(ref) + 1
+        for i in range(first, stop):
+            current = self.tree
+            j = i
+            while True:
+                if j == stop:
+                    current.out[('$', i)] = Node(stop, string_length, i)
+                    break
+                child = current.out.get(ref[j])
+                if child == None:
+                    current.out[ref[j]] = Node(j, string_length, i)
+                    break
+                length = child.end - child.start
+                k = 1
+                while k < length and j + k < stop and ref[j+k] == ref[child.start+k]:
+                    k += 1
+                if k == length:
+                    current = child
+                    j += k
+                    continue
+                start_edited = child.start + k
+                branch = Node(child.start, start_edited)
+                branch.out[ref[start_edited]] = child
+                branch.out[ref[j+k] if j + k < stop else ('$', i)] = Node(j + k, string_length, i)
+                child.start = start_edited
+                current.out[ref[j]] = branch
+                break
+
+    def locus(self, read, start=0):
+        '''match_locus of read[start:] in the tree: (node, letters matched).'''
+        return match_locus(self.tree, self.ref, read, start)
+
+    def search(self, read, max_hits=None):
+        '''All positions of read, or the first max_hits of them (in leaf order).'''
+        if not read:
+            return []
+        subtree, depth = match_locus(self.tree, self.ref, read)
+        if depth < len(read):
+            return []
+        return self._leaves(subtree, max_hits)
+
+    def count(self, read):
+        '''Number of occurrences of read, from the leaf interval of its locus
+        (O(m), no leaves are visited).'''
+        if not read:
+            return 0
+        subtree, depth = match_locus(self.tree, self.ref, read)
+        return subtree.leaf_hi - subtree.leaf_lo if depth == len(read) else 0
+
+    def _leaves(self, node, max_hits=None):
+        hi = node.leaf_hi if max_hits is None else min(node.leaf_hi, node.leaf_lo + max_hits)
+        return self.leaf_array[node.leaf_lo:hi]
+
+    def search_sorted(self, reads, max_hits=None):
+        '''Yields search(read, max_hits) for each of reads (sorted), starting
+        each walk from the deepest node on the previous read's path that is
+        still a prefix of the current read.'''
+        ref = self.ref
+        n = len(ref)
+        path = [(self.tree, 0)]  # (node, string depth) of fully matched nodes.
+        previous = ''
+        for read in reads:
+            m = len(read)
+            common = 0
+            limit = min(m, len(previous))
+            while common < limit and read[common] == previous[common]:
+                common += 1
+            while path[-1][1] > common:
+                path.pop()
+            previous = read
+            current, i = path[-1]
+            found = m > 0
+            while i < m:
+                child = current.out.get(read[i])
+                if child == None:
+                    found = False
+                    break
+                i += 1
+                j = child.start + 1
+                end = child.end if child.end < n else n
+                while j < end and i < m and read[i] == ref[j]:
+                    i += 1
+                    j += 1
+                if j != child.end:
+                    found = i == m
+                    current = child
+                    break
+                current = child
+                path.append((current, i))
+            yield self._leaves(current, max_hits) if found else []
         
 #############################################
 # Functions
@@ -35,10 +182,10 @@ def SuffixTree(string):
     print([t for t in bf_order(tree)])
     #>>> [[None, None, None], [0, 1, None], [1, 3, None], [6, 7, 6], [3, 7, 2], [1, 3, None], [6, 7, 5], [6, 7, 4], [3, 7, 1], [6, 7, 3], [3, 7, 0]]
     '''
-    if string == '' or string == None:
+    if not string:
         return None
 
-    string += '$'  # add sentinal to string.
+    string += b'$' if isinstance(string, bytes) else '$'  # add sentinal to string.
     tree = Node(None,None)  # create root.
     string_length = len(string)
     
@@ -76,6 +223,116 @@ def SuffixTree(string):
                 count+=1
     return tree
 
+def SuffixTreeMcCreight(string):
+    ''' Function for building a suffix tree in linear time (McCreight).
+    Produces the same Node() tree as SuffixTree() (same leaves, edges and
+    out-keys), so match_seq and bf_order work on either. Suffixes are still
+    added longest->shortest, but instead of walking every suffix from the
+    root we follow the suffix link of the previous head (fast-scan over
+    the part we know is in the tree, slow-scan over the rest).
+    Parent, string-depth and suffix-link bookkeeping is kept in dicts local
+    to the construction, so the finished tree is plain Node() objects.
+    
+    Example:
+    tree = SuffixTreeMcCreight('abab')
+    print(sorted(t[2] for t in bf_order(tree) if t[2] != None))
+    #>>> [0, 1, 2, 3, 4]
+    '''
+    if not string:
+        return None
+
+    string += b'$' if isinstance(string, bytes) else '$'  # add sentinal to string.
+    string_length = len(string)
+    tree = Node(None,None)  # create root.
+    parent = {tree: tree}
+    depth = {tree: 0}  # string depth of internal nodes.
+    link = {tree: tree}  # suffix links.
+
+    def split(node, child, k):
+        # split the edge node->child after k letters, returns the new node.
+        branch = Node(child.start, child.start+k)
+        branch.out[string[child.start+k]] = child
+        node.out[string[child.start]] = branch
+        child.start += k
+        parent[branch] = node
+        parent[child] = branch
+        depth[branch] = depth[node] + k
+        return branch
+
+    leaf = Node(0, string_length, 0)
+    tree.out[string[0]] = leaf
+    parent[leaf] = tree
+    for i in range(1, string_length):  # loop through remaining suffixes.
+        head = parent[leaf]  # head of the previous suffix.
+        if head is tree:
+            current = tree
+        elif head in link:
+            current = link[head]
+        else:
+            # fast-scan: s(head) is known to be in the tree, so only the first
+            # letter of each edge is looked at.
+            up = parent[head]
+            current = link[up]
+            remaining = depth[head] - 1 - depth[current]
+            j = i + depth[current]
+            while remaining > 0:
+                child = current.out[string[j]]
+                length = child.end-child.start
+                if length > remaining:
+                    current = split(current, child, remaining)
+                    break
+                current = child
+                j += length
+                remaining -= length
+            link[head] = current
+            if remaining > 0:
+                # s(head) ended inside an edge, so the new leaf branches there.
+                leaf = Node(i+depth[current], string_length, i)
+                current.out[string[leaf.start]] = leaf
+                parent[leaf] = current
+                continue
+
+        # slow-scan: compare letter by letter from current (as in SuffixTree).
+        j = i + depth[current]
+        while True:
+            if string[j] not in current.out:
+                leaf = Node(j, string_length, i)
+                current.out[string[j]] = leaf
+                parent[leaf] = current
+                break
+            child = current.out[string[j]]
+            length = child.end-child.start
+            k = 1
+            while k < length and string[j+k] == string[child.start+k]:
+                k += 1
+            if k == length:
+                current = child
+                j += k
+            else:
+                current = split(current, child, k)
+                leaf = Node(j+k, string_length, i)
+                current.out[string[j+k]] = leaf
+                parent[leaf] = current
+                break
+    return tree
+
+
+BUILDERS = {'naive': SuffixTree, 'mccreight': SuffixTreeMcCreight}
+BACKENDS = ['tree', 'compact', 'sa', 'scan']
+
+
+def build_index(ref, backend='tree', builder='naive'):
+    '''Returns an index over ref with a search(read) method giving all 0-based
+    positions where read occurs.'''
+    if backend == 'compact':
+        return CompactSuffixTree(ref)
+    if backend == 'sa':
+        return SuffixArray(ref)
+    if backend == 'scan':
+        return ScanIndex(ref)
+    return SuffixTreeIndex(ref, BUILDERS[builder])
+
+
 def bf_order(tree):
     '''Breath-first traversal using queue.
     Returns list containing all Node() values [start, end, suffix_order_leaf].
@@ -92,7 +349,7 @@ def bf_order(tree):
     queue = deque([tree])
 
     while queue:
-        if type(queue[-1]) is type(Node(None,None,None)):
+        if isinstance(queue[-1], Node):
             tmp = queue.pop()
             queue.appendleft([tmp.start,tmp.end,tmp.suffix_order_leaf])
             for sub in tmp.out:
@@ -103,6 +360,95 @@ def bf_order(tree):
             queue.pop()
             
     
+def iter_leaves(node):
+    '''Yields the suffix_order_leaf of every leaf below node (depth-first),
+    without building per-node lists.
+    
+    Example:
+    tree = SuffixTree('mississippi')
+    print(sorted(iter_leaves(match_seq(tree, 'mississippi', 'ss'))))
+    #>>> [2, 5]
+    '''
+    if node == None:
+        return
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.suffix_order_leaf != None:
+            yield node.suffix_order_leaf
+        else:
+            stack.extend(node.out.values())
+
+
+def leaf_intervals(tree):
+    '''Number the leaves of tree in depth-first order and store the range
+    of leaves below each node in node.leaf_lo/leaf_hi. Returns the array of
+    suffix_order_leaf in that order, so the occurrences below any node are
+    the slice leaf_array[node.leaf_lo:node.leaf_hi]. Call once per tree.
+    
+    Example:
+    tree = SuffixTree('mississippi')
+    leaf_array = leaf_intervals(tree)
+    node = match_seq(tree, 'mississippi', 'ss')
+    print(sorted(leaf_array[node.leaf_lo:node.leaf_hi]))
+    #>>> [2, 5]
+    '''
+    leaf_array = array('l')
+    if tree == None:
+        return leaf_array
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.leaf_lo == None:  # first visit.
+            node.leaf_lo = len(leaf_array)
+            if node.suffix_order_leaf != None:
+                leaf_array.append(node.suffix_order_leaf)
+                node.leaf_hi = len(leaf_array)
+            else:
+                stack.append(node)  # visit again when the children are done.
+                stack.extend(node.out.values())
+        else:
+            node.leaf_hi = len(leaf_array)
+    return leaf_array
+
+
+def match_locus(tree, ref, read, start=0):
+    '''Walks read down the tree comparing read and ref by index (no slicing
+    or string building). Returns (node, depth), where depth is how many
+    letters of read matched and node is the node at or below the end of
+    the matched prefix. read occurs in ref iff depth == len(read), and then
+    the leaves below node are its occurrences. With start, read[start:] is
+    matched (without slicing it).
+    
+    Example:
+    ref = 'mississippi'
+    tree = SuffixTree(ref)
+    node, depth = match_locus(tree, ref, 'ssix')
+    print(depth, sorted(iter_leaves(node)))
+    #>>> 3 [2, 5]
+    '''
+    if tree == None or not read:
+        return tree, 0
+    n = len(ref)
+    m = len(read)
+    current = tree
+    i = start
+    while i < m:
+        child = current.out.get(read[i])
+        if child == None:
+            return current, i - start
+        i += 1
+        j = child.start + 1
+        end = child.end if child.end < n else n  # the sentinal is not in ref.
+        while j < end and i < m and read[i] == ref[j]:
+            i += 1
+            j += 1
+        if j != child.end:
+            return child, i - start  # read ended or mismatched inside the edge.
+        current = child
+    return current, i - start
+
+
 def match_seq(tree, ref, read):
     '''Matches if read/pattern exists in tree and returns below subtree.
     
@@ -146,71 +492,219 @@ def match_seq(tree, ref, read):
         return current
 
 
-def read_fasta():
-    # load input:
-    inFile = sys.argv[1]
-    with open(inFile,'r') as f:
-        lines = f.readlines()
-    record_list = []
-    header = ''
-    sequence = []
-    for line in lines:
-        line = line.strip()
-        if line.startswith('>'):
-            if header != "":
-                record_list.append([header.strip(), ''.join(sequence).strip()])
-                sequence = []
-            header = line[1:]
-        else:
-            sequence.append(line)
-    record_list.append([header.strip(), ''.join(sequence).strip()])
-    return record_list
-
-
-def read_fastq():
-    inFile = sys.argv[2]  
-    with open(inFile,'r') as f:
-        lines = f.readlines()
-    record_list = []
-    header = ''
-    sequence = []
-    for line in lines:
-        line = line.strip()
-        if line.startswith('@'):
-            if header != "":
-                record_list.append([header.strip(), ''.join(sequence).strip()])
-                sequence = []
-            header = line[1:]
-        else:
-            sequence.append(line)
-    record_list.append([header.strip(), ''.join(sequence).strip()])
-    return record_list
+def read_fasta(inFile):
+    '''Returns [header, sequence] (str) of every record of a FASTA file.'''
+    return list(FastaFile(inFile).records())
+
+
+def add_fasta_arguments(parser):
+    parser.add_argument('--alphabet', choices=['dna', 'text'], default='text',
+                        help="text: match the letters as they are; dna: encode ACGT (any case), "
+                             "other letters are N and never match, default text")
+    parser.add_argument('--save-fai', action='store_true',
+                        help="Write genome.fa.fai (samtools faidx) next to the FASTA file, so later runs "
+                             "need not scan it")
+
+
+def load_records(fasta, alphabet, save_fai=False):
+    '''Yields the records of a FASTA file (path or FastaFile) one at a time,
+    as codes for the dna alphabet (see encoding.py).'''
+    if not isinstance(fasta, FastaFile):
+        fasta = FastaFile(fasta, save_fai)
+    return fasta.records(REFERENCE_TABLE if alphabet == 'dna' else None)
+
+
+def add_mapping_arguments(parser):
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help="Number of worker processes mapping reads, default 1")
+    parser.add_argument('--unordered', action='store_true',
+                        help="With --threads, write output as workers finish instead of in read order")
+    parser.add_argument('--format', choices=FORMATS, default='simple',
+                        help="Output: 5 column course format, full SAM with header, or binary records, default simple")
+    parser.add_argument('-d', '--edits', type=int, default=0,
+                        help="Maximum number of edits (mismatches, insertions, deletions), default 0. Needs the tree backend")
+    parser.add_argument('--seed-extend', type=int, default=0, metavar='MIN_SEED',
+                        help="Map long reads by chaining exact seeds of at least MIN_SEED letters and aligning "
+                             "between them. Needs the tree backend")
+    parser.add_argument('--both-strands', action='store_true',
+                        help="Also map the reverse complement of every read (reported with SAM flag 16)")
+    parser.add_argument('--max-hits', type=int, metavar='N',
+                        help="Report at most N hits per read (and strand); with --format sam every record gets "
+                             "the tag X0:i:<total number of hits of the read, of both strands with --both-strands>. "
+                             "Exact totals are counted, not enumerated")
+    parser.add_argument('--count-only', action='store_true',
+                        help="Write 'name<TAB>number of hits' for every read instead of the hits")
+    parser.add_argument('--cache', type=int, metavar='N',
+                        help="Keep the hits of the last N distinct reads (per worker) and reuse them for duplicates")
+    parser.add_argument('--cache-bytes', type=parse_size, metavar='SIZE',
+                        help="Like --cache, bounded by an estimated size such as 100M instead (or as well)")
+    parser.add_argument('--stats', nargs='?', const='-', metavar='FILE',
+                        help="Write stage timings, peak memory, node count and reads/hits per second as JSON "
+                             "to FILE, or to stderr without FILE")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="Dump cProfile statistics of the run (main process only) to FILE")
+
+
+def mapping_options(args):
+    return dict(threads=args.threads, ordered=not args.unordered, fmt=args.format,
+                command_line=' '.join(['st'] + sys.argv[1:]), edits=args.edits,
+                min_seed=args.seed_extend, both_strands=args.both_strands, max_hits=args.max_hits,
+                count_only=args.count_only)
+
+
+def check_mapping_arguments(parser, args):
+    if args.max_hits is not None and args.max_hits < 1:
+        parser.error('--max-hits must be at least 1')
+    if args.count_only and args.format == 'binary':
+        parser.error('--count-only writes text, not --format binary')
+
+
+def make_cache(args):
+    if args.cache is None and args.cache_bytes is None:
+        return None
+    return HitCache(args.cache, args.cache_bytes)
+
+
+def write_stats(args, stats, genome, reads, hits, cache=None):
+    if args.stats is None:
+        return
+    stats.counts.update(reads=reads, hits=hits, nodes=count_nodes(genome.index),
+                        reference_length=sum(genome.lengths))
+    if cache is not None:
+        stats.counts.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    stats.write(args.stats)
+
+
+def choose_backend(args, reference_length):
+    '''Returns the (backend, builder) to map with: the ones asked for, or
+    for --backend auto the planner's choice, which is logged to stderr.'''
+    if args.backend != 'auto':
+        return args.backend, args.builder or 'naive'
+    reads = planner.estimate_reads(args.reads)
+    available = planner.available_memory()
+    plan = planner.plan(reference_length, reads, args.threads, available,
+                        need_tree=args.edits > 0 or args.seed_extend > 0)
+    sys.stderr.write(planner.describe(plan, reference_length, reads, available) + '\n')
+    return plan.backend, args.builder or 'mccreight'
+
+
+def index_main(argv):
+    parser = argparse.ArgumentParser(prog='st index', usage='%(prog)s [options] genome.fa',
+                                     description="Build an index for a genome and save it to disk.")
+    parser.add_argument('genome', help="Reference genome (FASTA).")
+    parser.add_argument('-o', '--output', help="Index file, default genome.fa with .idx extension")
+    parser.add_argument('--backend', choices=sorted(INDEX_TYPES), default='sa',
+                        help="Array-backed index to save, default sa")
+    parser.add_argument('--append', metavar='INDEX',
+                        help="Add the records of genome.fa to INDEX (a compact index) instead of "
+                             "building a new index; INDEX is rewritten")
+    parser.add_argument('--prefix-length', type=int, default=0, metavar='K',
+                        help="Build the compact tree in buckets of suffixes sharing their first K letters "
+                             "(see chunked.py), default 0: in one piece")
+    parser.add_argument('--threads', type=int, default=1,
+                        help="Worker processes building buckets with --prefix-length, default 1")
+    parser.add_argument('--checkpoint', metavar='DIR',
+                        help="With --prefix-length, save finished buckets in DIR and reuse them when "
+                             "the build is run again")
+    parser.add_argument('--progress', action='store_true',
+                        help="With --prefix-length, report every finished bucket on stderr")
+    add_fasta_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.prefix_length < 0:
+        parser.error('--prefix-length must be at least 0')
+    if args.prefix_length and args.backend != 'compact':
+        parser.error('--prefix-length builds the compact backend, use --backend compact')
+
+    if args.append is not None:
+        try:
+            append_records(args.append, load_records(args.genome, args.alphabet, args.save_fai), args.genome)
+        except ValueError as e:
+            sys.exit('st index: {}'.format(e))
+        return
+    output = args.output or args.genome.rsplit('.', 1)[0] + '.idx'
+    if args.prefix_length:
+        progress = progress_printer() if args.progress else None
+        build = lambda text: build_chunked(text, args.prefix_length, args.threads, args.checkpoint, progress)
+    else:
+        build = lambda text: build_index(text, args.backend)
+    try:
+        genome = GeneralizedIndex.build(load_records(args.genome, args.alphabet, args.save_fai), build)
+    except ValueError as e:  # a checkpoint of another build.
+        sys.exit('st index: {}'.format(e))
+    write_index(output, genome, args.backend, args.genome)
+
+
+def search_main(argv):
+    parser = argparse.ArgumentParser(prog='st search', usage='%(prog)s [options] genome.idx reads.fq',
+                                     description="Map reads against an index built with 'st index'.")
+    parser.add_argument('index', help="Index file from 'st index'.")
+    parser.add_argument('reads', help="Reads to map (FASTQ).")
+    parser.add_argument('--genome', help="Check that the index was built from this FASTA file.")
+    add_mapping_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.edits > 0 or args.seed_extend > 0:
+        parser.error('-d/--edits and --seed-extend need the tree backend, which cannot be saved with st index')
+    check_mapping_arguments(parser, args)
+
+    stats = RunStats()
+    with profiled(args.profile):
+        with stats.stage('load'):
+            mapped = MappedIndex(args.index)
+            if args.genome is not None and not mapped.verify(args.genome):
+                sys.exit('st search: {} was not built from {}'.format(args.index, args.genome))
+        with stats.stage('map'):
+            cache = make_cache(args)
+            reads, hits = map_reads(mapped.genome, read_fastq(args.reads), cache=cache, timings=stats.map_stages,
+                                    **mapping_options(args))
+    write_stats(args, stats, mapped.genome, reads, hits, cache)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'index':
+        return index_main(argv[1:])
+    if argv and argv[0] == 'search':
+        return search_main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog='st', usage='%(prog)s [options] genome.fa reads.fq\n'
+                                     '       %(prog)s index [options] genome.fa\n'
+                                     '       %(prog)s search [options] genome.idx reads.fq',
+                                     description="Exact pattern matching of reads against a genome using a suffix tree.")
+    parser.add_argument('genome', help="Reference genome (FASTA).")
+    parser.add_argument('reads', help="Reads to map (FASTQ).")
+    parser.add_argument('--builder', choices=sorted(BUILDERS),
+                        help="Suffix tree construction algorithm (tree backend), default naive with --backend tree, "
+                             "mccreight when the tree is chosen automatically")
+    parser.add_argument('--backend', choices=['auto'] + BACKENDS, default='auto',
+                        help="Index used for searching: Node() suffix tree, array-backed suffix tree, suffix array "
+                             "or no index (scan the reference for every read). The default, auto, picks one from "
+                             "the reference length, number of reads and available memory (see planner.py)")
+    add_fasta_arguments(parser)
+    add_mapping_arguments(parser)
+    args = parser.parse_args(argv)
+    if (args.edits > 0 or args.seed_extend > 0) and args.backend not in ('auto', 'tree'):
+        parser.error('-d/--edits and --seed-extend need --backend tree')
+    check_mapping_arguments(parser, args)
+
+    stats = RunStats()
+    with profiled(args.profile):
+        with stats.stage('read_fasta'):
+            fasta = FastaFile(args.genome, args.save_fai)
+            backend, builder = choose_backend(args, sum(fasta.lengths))
+            fasta_recs = load_records(fasta, args.alphabet)
+        with stats.stage('build'):  # reads the records too, load_records is lazy.
+            genome = GeneralizedIndex.build(fasta_recs, lambda text: build_index(text, backend, builder))
+        with stats.stage('map'):
+            cache = make_cache(args)
+            reads, hits = map_reads(genome, read_fastq(args.reads), cache=cache, timings=stats.map_stages,
+                                    **mapping_options(args))
+    write_stats(args, stats, genome, reads, hits, cache)
 
 
 ################################################################
 # Code:
     
 if __name__ == '__main__':
-
-    fasta_recs = read_fasta()
-    fastq_recs = read_fastq()
-    
-    for fa_rec in fasta_recs:
-        ref = fa_rec[1]
-        tree = SuffixTree(ref)
-        for fq_rec in fastq_recs:
-            read = fq_rec[1]
-            subtree = match_seq(tree, ref, read)
-            matches = [t for t in bf_order(subtree) if t[2] != None]
-            for match in matches:
-                match = match[2]
-                read_name = fq_rec[0]
-                read_seq = fq_rec[1]
-                edits = get_edits(read_seq, fa_rec[1][match:match+len(fq_rec[1])])
-                cigar = edits_to_cigar(edits[2])
-                output = [read_name,fa_rec[0],str(match+1),cigar,read_seq]
-                print('\t'.join(output))
-          
+    main()
         
 ################################################################
-
@@ -0,0 +1,148 @@
+"""Run statistics and profiling for st (--stats and --profile).
+
+RunStats times the stages of a run (reading the genome, building or
+loading the index, mapping) with time.perf_counter and collects counts,
+and report() adds the peak resident set size and the rates:
+
+    {"stages": {"read_fasta": 0.01, "build": 1.2, "map": 3.4},
+     "map_stages": {"search": 2.5, "report": 0.6, "write": 0.2},
+     "total_seconds": 4.61, "peak_rss_bytes": 123456789,
+     "nodes": 250001, "reads": 100000, "hits": 150000,
+     "reads_per_second": 29411.8, "hits_per_second": 44117.6,
+     "stage_rates": {"map": {"reads_per_second": 29411.8, ...},
+                     "search": {"reads_per_second": 40000.0, ...}, ...}}
+
+map_stages splits mapping into searching the reads, reporting the hits
+(locating and formatting the records) and joining and writing the
+output (see mapper.map_reads). They are summed over the chunks, and
+with --threads over the worker processes, so they are CPU seconds that
+can add up to more than the map stage. The FASTA records are read
+lazily, while the index is built, so read_fasta only times opening the
+FASTA file (its .fai or a scan for the record lengths) and build
+includes reading the sequences.
+
+Timing a stage is two perf_counter calls, so a RunStats is always used
+and only written out when asked for; node counts, which walk the whole
+index, are only computed for --stats.
+"""
+
+################################################################
+# libraries:
+import sys
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not on Windows.
+    resource = None
+
+################################################################
+# Functions:
+
+def peak_rss():
+    '''Peak resident set size in bytes of this process or its largest
+    child (worker) process, None where the resource module is missing.'''
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB.
+
+
+def count_nodes(index):
+    '''Number of nodes of a search index (Node() tree or array-backed tree),
+    None for indexes without nodes (suffix arrays).'''
+    if getattr(index, 'tree', None) is not None:
+        nodes = 0
+        stack = [index.tree]
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            stack.extend(node.out.values())
+        return nodes
+    if hasattr(index, 'first_child'):
+        return len(index.first_child)
+    return None
+
+
+@contextmanager
+def profiled(path):
+    '''Profile the block with cProfile and dump the statistics to path (for
+    pstats or snakeviz). Does nothing if path is None. Only this process is
+    profiled, not --threads worker processes.'''
+    if path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+@contextmanager
+def timed(timings, name):
+    '''Add the seconds spent in the block to timings[name] (a dict).'''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+
+
+################################################################
+# Classes:
+
+class RunStats(object):
+    def __init__(self):
+        ''' Stage timings and counts of one st run.
+
+        Example:
+        stats = RunStats()
+        with stats.stage('build'):
+            index = build_index(ref)
+        stats.counts['reads'] = 10
+        stats.write('-')  # JSON to stderr.
+        '''
+        self.stages = {}
+        self.map_stages = {}  # filled by mapper.map_reads(timings=...).
+        self.counts = {}
+        self._start = time.perf_counter()
+
+    def stage(self, name):
+        return timed(self.stages, name)
+
+    def _rates(self, seconds):
+        return {count + '_per_second': self.counts[count] / seconds
+                for count in ['reads', 'hits'] if count in self.counts}
+
+    def report(self):
+        report = {'stages': dict(self.stages),
+                  'total_seconds': time.perf_counter() - self._start,
+                  'peak_rss_bytes': peak_rss()}
+        if self.map_stages:
+            report['map_stages'] = dict(self.map_stages)
+        report.update(self.counts)
+        if self.stages.get('map'):
+            report.update(self._rates(self.stages['map']))
+        rates = {}
+        for name, seconds in [('map', self.stages.get('map'))] + sorted(self.map_stages.items()):
+            if seconds:
+                rates[name] = self._rates(seconds)
+        if rates:
+            report['stage_rates'] = rates
+        return report
+
+    def write(self, path):
+        '''Write report() as JSON to path, or to stderr if path is '-'.'''
+        text = json.dumps(self.report(), indent=2) + '\n'
+        if path == '-':
+            sys.stderr.write(text)
+        else:
+            with open(path, 'w') as f:
+                f.write(text)
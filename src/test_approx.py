@@ -0,0 +1,101 @@
+import random
+
+from approx import approx_search
+from cigar import cigar_to_edits
+from st import SuffixTreeIndex
+from SEQsimulator import simulate_string, get_exact_read, get_approx_read
+
+
+def edits_used(read, ref, position, cigar):
+    # number of edits in the alignment of read to ref[position:] given by cigar.
+    i, j, count = 0, position, 0
+    for op in cigar_to_edits(cigar):
+        if op == 'M':
+            count += read[i] != ref[j]
+            i += 1
+            j += 1
+        elif op == 'I':
+            count += 1
+            i += 1
+        else:
+            count += 1
+            j += 1
+    assert i == len(read) and j <= len(ref)
+    return count, j - position
+
+
+def test_exact_when_no_edits():
+    random.seed(13)
+    for _ in range(50):
+        ref = simulate_string(random.randint(20, 80))
+        index = SuffixTreeIndex(ref)
+        read = get_exact_read(ref, random.randint(1, 10))
+        hits = approx_search(index, read, 0)
+        assert [h[0] for h in hits] == sorted(index.search(read))
+        assert all(h[1] == '{}M'.format(len(read)) for h in hits)
+
+
+def test_hits_within_edits():
+    random.seed(14)
+    for _ in range(50):
+        ref = simulate_string(random.randint(20, 80))
+        index = SuffixTreeIndex(ref)
+        for d in [1, 2]:
+            read = get_approx_read(ref, random.randint(4, 10), d)
+            hits = approx_search(index, read, d)
+            for position, cigar, span in hits:
+                count, used = edits_used(read, ref, position, cigar)
+                assert count <= d and used == span
+            # every placement with at most d mismatches is found, or a hit
+            # of the same locus with at most as many edits.
+            found = {position: edits_used(read, ref, position, cigar)[0] for position, cigar, _ in hits}
+            for p in range(len(ref) - len(read) + 1):
+                mismatches = sum(a != b for a, b in zip(read, ref[p:]))
+                if mismatches <= d:
+                    assert any(abs(q - p) <= 2 * d and edits <= mismatches for q, edits in found.items())
+
+
+def test_long_read():
+    random.seed(15)
+    ref = simulate_string(3000)
+    index = SuffixTreeIndex(ref)
+    read = ref[500:1700]  # longer than the recursion limit.
+    read = read[:600] + ('A' if read[600] != 'A' else 'C') + read[601:]
+    assert (500, '1200M', 1200) in approx_search(index, read, 1)
+
+
+def min_edits(read, ref, p):
+    # fewest edits of an alignment of read to ref starting at p with read[0]
+    # against ref[p] (no leading indel), ending anywhere.
+    column = list(range(len(read)))  # read[1:i+1] against nothing.
+    best = column[-1]
+    for j in range(p + 1, len(ref)):
+        new = [column[0] + 1]
+        for i in range(1, len(read)):
+            new.append(min(column[i-1] + (read[i] != ref[j]), column[i] + 1, new[i-1] + 1))
+        column = new
+        best = min(best, column[-1])
+    return (read[0] != ref[p]) + best
+
+
+def test_one_minimal_hit_per_locus():
+    random.seed(16)
+    for _ in range(40):
+        ref = simulate_string(random.randint(30, 60))
+        index = SuffixTreeIndex(ref)
+        for d in [1, 2]:
+            read = get_approx_read(ref[:-5], random.randint(5, 10), d)
+            hits = approx_search(index, read, d)
+            assert len({position for position, _, _ in hits}) == len(hits)
+            assert len({position + span for position, _, span in hits}) == len(hits)
+            found = {}
+            for position, cigar, span in hits:
+                found[position] = edits_used(read, ref, position, cigar)[0]
+                assert found[position] == min_edits(read, ref, position) <= d
+            # every position with a close enough alignment (and room after it)
+            # is found, or a hit ending at the same place (at most 2d letters
+            # away: one alignment has d insertions, the other d deletions) with
+            # no more edits.
+            for p in range(len(ref) - len(read) - d):
+                if min_edits(read, ref, p) <= d:
+                    assert any(abs(q - p) <= 2 * d and edits <= min_edits(read, ref, p) for q, edits in found.items())
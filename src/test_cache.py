@@ -0,0 +1,47 @@
+import io
+import os
+
+from cache import HitCache, parse_size, ENTRY_BYTES, HIT_BYTES
+from mapper import map_reads
+from st import build_index, read_fasta
+from generalized import GeneralizedIndex
+from seqio import read_fastq
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_lru_entries():
+    cache = HitCache(max_entries=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    assert cache.get('a') == [1]  # b is now the least recently used.
+    cache.put('c', [3])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1] and cache.get('c') == [3]
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_lru_bytes():
+    size = ENTRY_BYTES + 1 + HIT_BYTES
+    cache = HitCache(max_bytes=2 * size)
+    for read in 'abc':
+        cache.put(read, [0])
+    assert len(cache) == 2 and cache.nbytes == 2 * size and cache.get('a') is None
+    cache.put('d', [0] * 10)  # larger than the whole cache.
+    assert cache.get('d') is None and len(cache) == 2
+    assert parse_size('2K') == 2048 and parse_size('1.5M') == 3 << 19 and parse_size('10') == 10
+
+
+def test_map_reads_with_cache():
+    genome = GeneralizedIndex.build(read_fasta(os.path.join(HERE, 'data_for_testing', 'mississippi.fa')), build_index)
+    reads = list(read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq'))) * 3
+    expected = io.StringIO()
+    map_reads(genome, reads, expected)
+    for threads, edits in [(1, 0), (2, 0), (1, 1)]:
+        cache = HitCache(max_entries=10)
+        out = io.StringIO()
+        map_reads(genome, reads, out, threads=threads, chunk_size=4, edits=edits, cache=cache)
+        if edits == 0:
+            assert out.getvalue() == expected.getvalue()
+        assert cache.hits + cache.misses == 12
+        assert cache.hits >= 4
@@ -0,0 +1,47 @@
+import os
+import random
+
+import pytest
+
+from chunked import build_chunked, bucket_positions
+from compact_st import CompactSuffixTree
+from SEQsimulator import simulate_string
+
+
+def test_buckets_partition_suffixes():
+    string = b'ACGTACGA$'
+    buckets = bucket_positions(string, 2)
+    assert [key for key, _ in buckets] == sorted(key for key, _ in buckets)
+    assert sorted(i for _, positions in buckets for i in positions) == list(range(len(string)))
+
+
+def test_chunked_against_compact():
+    random.seed(25)
+    for _ in range(100):
+        ref = random.choice([simulate_string(random.randint(1, 80)), 'A' * random.randint(1, 30)])
+        k = random.randint(1, 4)
+        tree = build_chunked(ref, k)
+        expected = CompactSuffixTree(ref)
+        assert len(tree) == len(expected)
+        for _ in range(10):
+            read = simulate_string(random.randint(1, 5))
+            assert sorted(tree.search(read)) == sorted(expected.search(read))
+
+
+def test_checkpoint_resume(tmp_path):
+    random.seed(7)
+    ref = simulate_string(2000)
+    directory = str(tmp_path / 'checkpoint')
+    calls = []
+    build_chunked(ref, 2, threads=2, checkpoint=directory, progress=lambda *done: calls.append(done))
+    assert calls[-1][0] == calls[-1][1] == len(calls)
+    buckets = sorted(name for name in os.listdir(directory) if name.startswith('bucket-'))
+    assert len(buckets) == len(calls)
+    for name in buckets[::2]:  # as if the build had stopped.
+        os.remove(os.path.join(directory, name))
+    tree = build_chunked(ref, 2, checkpoint=directory)
+    expected = CompactSuffixTree(ref)
+    for read in ['A', 'AC', 'GTA', 'TTTG', ref[100:130]]:
+        assert sorted(tree.search(read)) == sorted(expected.search(read))
+    with pytest.raises(ValueError):
+        build_chunked(ref, 3, checkpoint=directory)
@@ -0,0 +1,18 @@
+import random
+
+from align import get_edits
+from cigar import edits_to_cigar, cigar_to_edits, exact_cigar
+
+
+def test_round_trip():
+    random.seed(4)
+    for _ in range(200):
+        edits = ''.join(random.choice('MMMID') for _ in range(random.randint(0, 30)))
+        assert cigar_to_edits(edits_to_cigar(edits)) == edits
+
+
+def test_exact():
+    assert edits_to_cigar('M' * 150) == exact_cigar(150) == '150M'
+    assert get_edits('ACGT', 'ACGT') == ('ACGT', 'ACGT', 'MMMM')
+    assert get_edits('ACCACAGT-CATA', 'A-CAGAGTACAAA') == ('ACCACAGTCATA', 'ACAGAGTACAAA', 'MDMMMMMMIMMMM')
+    assert edits_to_cigar('') == ''
@@ -0,0 +1,23 @@
+import random
+
+from compact_st import CompactSuffixTree
+from naive import naive_algorithm
+from SEQsimulator import simulate_string, get_exact_read
+
+
+def test_compact_mississippi():
+    tree = CompactSuffixTree('mississippi')
+    assert sorted(tree.search('ss')) == [2, 5]
+    assert sorted(tree.search('i')) == [1, 4, 7, 10]
+    assert tree.search('sss') == []
+    assert sorted(tree.leaves(0)) == list(range(12))
+
+
+def test_compact_against_naive():
+    random.seed(2022)
+    for _ in range(200):
+        ref = simulate_string(random.randint(30, 90))
+        read = get_exact_read(ref, random.randint(1, 20))
+        tree = CompactSuffixTree(ref)
+        assert sorted(tree.search(read)) == naive_algorithm(ref, read)
+        assert len(list(tree.leaves(0))) == len(ref) + 1
@@ -0,0 +1,26 @@
+import io
+
+from encoding import encode_reference, encode_read, encode_records, decode, N, READ_N
+from generalized import GeneralizedIndex
+from st import build_index, BACKENDS
+from mapper import map_reads
+
+
+def test_codes():
+    assert encode_reference('ACGTacgt') == bytes([0, 1, 2, 3, 0, 1, 2, 3])
+    assert encode_reference('NRY-') == bytes([N] * 4)
+    assert encode_read('AnX') == bytes([0, READ_N, READ_N])
+    assert decode(encode_reference('acgtnR')) == 'ACGTNN'
+
+
+def test_n_and_case():
+    records = [['chr1', 'ACGTNNacgt'], ['chr2', 'TTTT']]
+    for backend in BACKENDS:
+        genome = GeneralizedIndex.build(encode_records(records), lambda text: build_index(text, backend, 'mccreight'))
+        assert genome.encoded
+        reads = [('r1', 'ACGT', ''), ('r2', 'GTN', ''), ('r3', 'TT', '')]
+        out = io.StringIO()
+        assert map_reads(genome, reads, out) == (3, 5)
+        hits = sorted(tuple(line.split('\t')[:3]) for line in out.getvalue().splitlines())
+        assert hits == [('r1', 'chr1', '1'), ('r1', 'chr1', '7'),
+                        ('r3', 'chr2', '1'), ('r3', 'chr2', '2'), ('r3', 'chr2', '3')]
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from generalized import GeneralizedIndex
+from sa import SuffixArray
+from compact_st import CompactSuffixTree
+from st import SuffixTreeIndex
+from SEQsimulator import simulate_string
+
+
+def test_hits_per_record():
+    random.seed(3)
+    recs = [['chr{}'.format(k), simulate_string(random.randint(1, 40))] for k in range(10)]
+    genome = GeneralizedIndex.build(recs, SuffixArray)
+    for _ in range(100):
+        read = simulate_string(random.randint(1, 4))
+        expected = sorted((k, i) for k, (_, seq) in enumerate(recs) for i in range(len(seq)) if seq.startswith(read, i))
+        assert sorted(hit[:2] for hit in genome.hits(read)) == expected
+
+
+def test_hits_do_not_span_records():
+    genome = GeneralizedIndex.build([['a', 'AC'], ['b', 'GT']], SuffixArray)
+    assert list(genome.hits('CG')) == []
+    assert list(genome.hits('GT')) == [(1, 0, 3)]
+
+
+def test_append_matches_build():
+    random.seed(24)
+    recs = [['chr{}'.format(k), simulate_string(random.randint(1, 40))] for k in range(6)]
+    full = GeneralizedIndex.build(recs, SuffixArray)
+    for backend in [CompactSuffixTree, SuffixTreeIndex]:
+        genome = GeneralizedIndex.build(recs[:3], backend)
+        for name, seq in recs[3:]:
+            genome.append(name, seq)
+        assert genome.names == full.names
+        assert list(genome.starts) == list(full.starts)
+        for _ in range(100):
+            read = simulate_string(random.randint(1, 4))
+            assert sorted(genome.hits(read)) == sorted(full.hits(read))
+
+
+def test_append_needs_a_tree():
+    genome = GeneralizedIndex.build([['a', 'ACGT']], SuffixArray)
+    with pytest.raises(ValueError):
+        genome.append('b', 'ACGT')
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from index_io import write_index, append_records, MappedIndex
+from generalized import GeneralizedIndex
+from st import build_index, read_fasta
+from encoding import encode_records, encode_read
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FASTA = os.path.join(HERE, 'data_for_testing', 'mississippi.fa')
+
+
+def test_round_trip(tmp_path):
+    for backend in ['sa', 'compact']:
+        built = GeneralizedIndex.build(read_fasta(FASTA), lambda text: build_index(text, backend))
+        path = str(tmp_path / 'mississippi.idx')
+        write_index(path, built, backend, FASTA)
+
+        mapped = MappedIndex(path)
+        assert mapped.backend == backend
+        assert mapped.verify(FASTA)
+        loaded = mapped.genome
+        assert loaded.names == ['chr1', 'chr2']
+        assert list(loaded.starts) == [0, 12]
+        for read in ['iss', 'mis', 'ssippi', 'x', 'i', 'pim']:
+            assert sorted(loaded.hits(read)) == sorted(built.hits(read))
+
+
+def test_round_trip_encoded(tmp_path):
+    fasta = os.path.join(HERE, 'data_for_testing', 'fasta.fa')
+    built = GeneralizedIndex.build(encode_records(read_fasta(fasta)), lambda text: build_index(text, 'sa'))
+    path = str(tmp_path / 'fasta.idx')
+    write_index(path, built, 'sa', fasta)
+    loaded = MappedIndex(path).genome
+    assert loaded.encoded
+    for read in ['ACGT', 'GGGAGAATG', 'ACGN']:
+        read = encode_read(read)
+        assert sorted(loaded.hits(read)) == sorted(built.hits(read))
+
+
+def test_append_records(tmp_path):
+    fasta = os.path.join(HERE, 'data_for_testing', 'fasta.fa')
+    recs = list(encode_records(read_fasta(fasta)))
+    built = GeneralizedIndex.build(recs[:1], lambda text: build_index(text, 'compact'))
+    path = str(tmp_path / 'fasta.idx')
+    write_index(path, built, 'compact', fasta)
+    append_records(path, recs[1:2], fasta)
+    append_records(path, recs[2:], fasta)
+
+    mapped = MappedIndex(path)
+    assert isinstance(mapped.genome.index.start, memoryview)  # nothing is inserted when loading.
+    assert len(mapped.header['appended']) == 2 and mapped.verify(fasta)
+    full = GeneralizedIndex.build(recs, lambda text: build_index(text, 'sa'))
+    assert mapped.genome.names == full.names
+    for read in ['ACGT', 'GGGAGAATG', 'TTA', 'ACGN']:
+        read = encode_read(read)
+        assert sorted(mapped.genome.hits(read)) == sorted(full.hits(read))
+
+
+def test_append_needs_a_tree(tmp_path):
+    built = GeneralizedIndex.build(read_fasta(FASTA), lambda text: build_index(text, 'sa'))
+    path = str(tmp_path / 'mississippi.idx')
+    write_index(path, built, 'sa', FASTA)
+    with pytest.raises(ValueError):
+        append_records(path, [['chr3', 'ssi']], FASTA)
@@ -0,0 +1,72 @@
+import random
+
+from align import banded_align
+from longread import seed_extend, chain_seeds
+from st import SuffixTreeIndex, SuffixTreeMcCreight
+from SEQsimulator import simulate_string
+from test_approx import edits_used
+
+
+def edit_distance(p, q):
+    row = list(range(len(q) + 1))
+    for i in range(1, len(p) + 1):
+        prev, row[0] = row[0], i
+        for j in range(1, len(q) + 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j-1] + 1, prev + (p[i-1] != q[j-1]))
+    return row[-1]
+
+
+def test_banded_align_optimal_in_wide_band():
+    random.seed(21)
+    for _ in range(100):
+        p = simulate_string(random.randint(0, 15))
+        q = simulate_string(random.randint(0, 15))
+        p_row, q_row = banded_align(p, q, 15)
+        assert p_row.replace('-', '') == p and q_row.replace('-', '') == q
+        assert sum(a != b for a, b in zip(p_row, q_row)) == edit_distance(p, q)
+
+
+def test_chain_seeds():
+    seeds = [(0, 100, 20), (25, 126, 20), (50, 149, 20), (10, 500, 25)]
+    assert chain_seeds(seeds, 4) == [[(0, 100, 20), (25, 126, 20), (50, 149, 20)]]
+
+
+def test_long_reads():
+    random.seed(22)
+    ref = simulate_string(20000)
+    index = SuffixTreeIndex(ref, SuffixTreeMcCreight)
+    for _ in range(5):
+        position = random.randrange(len(ref) - 1500)
+        read = list(ref[position:position+1000])
+        for _ in range(20):
+            k = random.randrange(len(read))
+            read[k] = random.choice('ACGT')
+        read = ''.join(read)
+        hits = seed_extend(index, read)
+        assert len(hits) == 1
+        start, cigar, span = hits[0]
+        assert abs(start - position) <= 20
+        count, used = edits_used(read, ref, start, cigar)
+        assert count <= 20 and used == span
+
+
+def test_indel_drift():
+    random.seed(23)
+    ref = simulate_string(20000)
+    index = SuffixTreeIndex(ref, SuffixTreeMcCreight)
+    # 40 one-letter insertions move the diagonal by 40 along the read.
+    read = list(ref[5000:8000])
+    for k in range(40, 3000, 75)[::-1]:
+        read.insert(k, random.choice('ACGT'))
+    read = ''.join(read)
+    hits = seed_extend(index, read)
+    assert len(hits) == 1
+    start, cigar, span = hits[0]
+    assert start == 5000 and span == 3000
+    count, used = edits_used(read, ref, start, cigar)
+    assert count <= 40 and used == span
+    # a 100 letter deletion in the middle.
+    read = ref[5000:6500] + ref[6600:8000]
+    [(start, cigar, span)] = seed_extend(index, read)
+    assert start == 5000 and span == 3000 and '100D' in cigar
+    assert edits_used(read, ref, start, cigar) == (100, span)
@@ -0,0 +1,85 @@
+import io
+import os
+import random
+
+from mapper import map_reads, chunks, search_many
+from SEQsimulator import simulate_string, get_exact_read
+from st import build_index, read_fasta, BACKENDS
+from generalized import GeneralizedIndex
+from seqio import read_fastq
+from encoding import encode_records
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_chunks():
+    assert list(chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunks([], 3)) == []
+
+
+def test_parallel_matches_serial():
+    records = GeneralizedIndex.build(read_fasta(os.path.join(HERE, 'data_for_testing', 'mississippi.fa')), build_index)
+    reads = list(read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')))
+    serial = io.StringIO()
+    map_reads(records, reads, serial)
+    for ordered in [True, False]:
+        parallel = io.StringIO()
+        map_reads(records, reads, parallel, threads=2, ordered=ordered, chunk_size=1)
+        assert sorted(parallel.getvalue().splitlines()) == sorted(serial.getvalue().splitlines())
+    ordered = io.StringIO()
+    map_reads(records, iter(reads), ordered, threads=3, chunk_size=1)
+    assert ordered.getvalue() == serial.getvalue()
+    assert len(serial.getvalue().splitlines()) == 18
+
+
+def test_search_many():
+    random.seed(10)
+    ref = simulate_string(300)
+    reads = [get_exact_read(ref, random.randint(1, 12)) for _ in range(100)]
+    reads += reads[:20] + ['', 'ACGTTTTTTTTTT', ref]
+    random.shuffle(reads)
+    for backend in BACKENDS:
+        index = build_index(ref, backend, 'mccreight')
+        read_idx, positions = search_many(index, reads)
+        hits = [[] for _ in reads]
+        for k, position in zip(read_idx, positions):
+            hits[k].append(position)
+        assert list(read_idx) == sorted(read_idx)
+        assert [sorted(h) for h in hits] == [sorted(index.search(read)) for read in reads]
+
+
+def test_both_strands():
+    ref = 'TTTTACCGGTAAACGTTCAGGG'
+    genome = GeneralizedIndex.build(encode_records([['chr1', ref]]), lambda text: build_index(text, 'sa'))
+    reads = [('fwd', 'ACGTTC', 'ABCDEF'), ('rev', 'GAACGT', 'ABCDEF'), ('pal', 'ACCGGT', '')]
+    out = io.StringIO()
+    map_reads(genome, reads, out, fmt='sam', both_strands=True)
+    records = [line.split('\t') for line in out.getvalue().splitlines() if not line.startswith('@')]
+    assert [(r[0], r[1], r[3], r[9], r[10]) for r in records] == [
+        ('fwd', '0', '13', 'ACGTTC', 'ABCDEF'),
+        ('rev', '16', '13', 'ACGTTC', 'FEDCBA'),
+        ('pal', '0', '5', 'ACCGGT', '*')]
+    out = io.StringIO()
+    map_reads(genome, reads, out, fmt='sam')
+    assert len(out.getvalue().splitlines()) == 3 + 2  # header lines and the forward hits.
+
+
+def test_max_hits_and_count_only():
+    genome_text = [['chr1', 'A' * 200 + 'CGT'], ['chr2', 'AAAC']]
+    reads = [('r1', 'AAA', 'III'), ('r2', 'CGT', 'III'), ('r3', 'GG', 'II')]
+    for backend in BACKENDS:
+        genome = GeneralizedIndex.build(encode_records(genome_text),
+                                        lambda text: build_index(text, backend, 'mccreight'))
+        out = io.StringIO()
+        map_reads(genome, reads, out, fmt='sam', max_hits=3)
+        records = [line.split('\t') for line in out.getvalue().splitlines() if not line.startswith('@')]
+        assert [(r[0], r[11]) for r in records] == [('r1', 'X0:i:199')] * 3 + [('r2', 'X0:i:1')]
+        out = io.StringIO()
+        assert map_reads(genome, reads, out, count_only=True, chunk_size=2) == (3, 200)
+        assert out.getvalue() == 'r1\t199\nr2\t1\nr3\t0\n'
+        assert map_reads(genome, reads, io.StringIO(), count_only=True, threads=2, chunk_size=2) == (3, 200)
+        # X0 is the total of both strands on the records of either: CGT and ACG occur once each.
+        out = io.StringIO()
+        map_reads(genome, reads[1:2], out, fmt='sam', max_hits=3, both_strands=True)
+        records = [line.split('\t') for line in out.getvalue().splitlines() if not line.startswith('@')]
+        assert [(r[1], r[11]) for r in records] == [('0', 'X0:i:2'), ('272', 'X0:i:2')]
@@ -0,0 +1,24 @@
+import random
+
+from naive import naive_algorithm, scan_search, ScanIndex
+from SEQsimulator import simulate_string, get_exact_read
+
+
+def test_naive_algorithm_edge_cases():
+    assert naive_algorithm('ACGT', 'ACGT') == [0]
+    assert naive_algorithm('ACG', 'ACGT') == []
+    assert naive_algorithm('', 'A') == []
+    # both baselines are case-sensitive.
+    for ref, read in [('acgtACGT', 'ACG'), ('acgtACGT', 'acg'), ('ACGT', 'cg')]:
+        assert naive_algorithm(ref, read) == scan_search(ref, read)
+    assert naive_algorithm('acgtACGT', 'ACG') == [4]
+
+
+def test_scan_matches_naive():
+    random.seed(19)
+    for _ in range(200):
+        ref = simulate_string(random.randint(2, 60))
+        read = get_exact_read(ref, random.randint(1, len(ref) - 1)) if random.random() < 0.5 else simulate_string(3)
+        assert scan_search(ref, read) == naive_algorithm(ref, read)
+        assert ScanIndex(ref.encode()).search(read) == naive_algorithm(ref, read)
+    assert scan_search('AAAA', 'AA') == [0, 1, 2]
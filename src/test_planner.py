@@ -0,0 +1,31 @@
+import os
+
+from planner import plan, estimate, estimate_reads
+from st import main
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_plan():
+    assert plan(100, 10).backend == 'scan'
+    assert plan(10**6, 10**6).backend == 'compact'
+    assert plan(10**6, 10**6, need_tree=True).backend == 'tree'
+    # the fastest index does not fit, the next one does.
+    memory = {backend: estimate(backend, 10**6, 10**6)[1] for backend in ['compact', 'sa']}
+    assert plan(10**6, 10**6, available=memory['compact'] / 2).backend == 'scan'
+    assert plan(10**6, 10**6, available=0).reason.startswith('smallest')
+
+
+def test_estimate_reads(tmp_path):
+    assert estimate_reads(os.path.join(HERE, 'data_for_testing', 'fastq.fq')) == 100
+    assert estimate_reads(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')) == 4
+    path = tmp_path / 'reads.fq'
+    path.write_text(''.join('@r{}\nACGT\n+\nIIII\n'.format(i) for i in range(50)))
+    assert estimate_reads(str(path)) == 50
+
+
+def test_auto_backend(capsys):
+    main([os.path.join(HERE, 'data_for_testing', 'fasta.fa'), os.path.join(HERE, 'data_for_testing', 'fastq.fq')])
+    captured = capsys.readouterr()
+    assert 'using the scan backend' in captured.err
+    assert len(captured.out.splitlines()) == 100
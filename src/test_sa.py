@@ -0,0 +1,40 @@
+import random
+
+from sa import SuffixArray, suffix_array
+from st import build_index, BACKENDS
+from SEQsimulator import simulate_string, get_exact_read
+
+
+def test_suffix_array_sorted():
+    random.seed(7)
+    for _ in range(100):
+        string = (simulate_string(random.randint(0, 60)) + '$').encode()
+        sa = suffix_array(string)
+        assert list(sa) == sorted(range(len(string)), key=lambda i: string[i:])
+
+
+def test_backends_agree():
+    random.seed(11)
+    for _ in range(100):
+        ref = simulate_string(random.randint(30, 90))
+        read = get_exact_read(ref, random.randint(1, 20))
+        hits = [sorted(build_index(ref, backend).search(read)) for backend in BACKENDS]
+        assert hits[0] == hits[1] == hits[2]
+
+
+def test_sa_mississippi():
+    index = SuffixArray('mississippi')
+    assert sorted(index.search('ssi')) == [2, 5]
+    assert list(index.search('x')) == []
+    assert index.search('') == []
+
+
+def test_interval_repetitive():
+    random.seed(12)
+    for ref in ['A' * 50, 'AC' * 30, 'AAC' * 20 + 'AAG']:
+        index = SuffixArray(ref)
+        for _ in range(50):
+            read = ''.join(random.choice('ACG') for _ in range(random.randint(1, 12)))
+            expected = [i for i in range(len(ref)) if ref.startswith(read, i)]
+            lo, hi = index.interval(read)
+            assert sorted(index.sa[lo:hi]) == expected and index.count(read) == len(expected)
@@ -0,0 +1,48 @@
+import io
+import os
+
+from generalized import GeneralizedIndex
+from mapper import map_reads
+from sam import SamWriter, read_binary
+from st import build_index, read_fasta
+from seqio import read_fastq
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def mississippi():
+    return GeneralizedIndex.build(read_fasta(os.path.join(HERE, 'data_for_testing', 'mississippi.fa')), build_index)
+
+
+def test_full_sam():
+    out = io.StringIO()
+    map_reads(mississippi(), read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')), out, fmt='sam')
+    lines = out.getvalue().splitlines()
+    header = [line for line in lines if line.startswith('@')]
+    assert header[:3] == ['@HD\tVN:1.6\tSO:unsorted', '@SQ\tSN:chr1\tLN:11', '@SQ\tSN:chr2\tLN:22']
+    records = [line.split('\t') for line in lines if not line.startswith('@')]
+    assert len(records) == 18
+    assert all(len(r) == 11 for r in records)
+    primary = [r[0] for r in records if r[1] == '0']
+    assert sorted(primary) == ['read1', 'read2', 'read3', 'read4']
+
+
+def test_binary_round_trip():
+    out = io.BytesIO()
+    map_reads(mississippi(), read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')), out, fmt='binary')
+    simple = io.StringIO()
+    map_reads(mississippi(), read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')), simple)
+    out.seek(0)
+    names, lengths, records = read_binary(out)
+    assert names == ['chr1', 'chr2'] and lengths == [11, 22]
+    lines = ['\t'.join([q, r, str(p + 1), c, s]) for q, f, r, p, c, s, _ in records]
+    assert lines == simple.getvalue().splitlines()
+
+
+def test_writer_buffers():
+    out = io.StringIO()
+    writer = SamWriter(out, buffer_size=10)
+    writer.write('abc\n')
+    assert out.getvalue() == ''
+    writer.write('defghijk\n')
+    assert out.getvalue() == 'abc\ndefghijk\n'
@@ -0,0 +1,67 @@
+import gzip
+import os
+
+from seqio import read_fastq, FastaFile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_two_line_records():
+    recs = list(read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')))
+    assert [r[:2] for r in recs] == [('read1', 'iss'), ('read2', 'mis'), ('read3', 'ssi'), ('read4', 'ssippi')]
+    assert all(r[2] == '' for r in recs)
+
+
+def test_four_line_records(tmp_path):
+    text = '@r1 first\nACGT\n+\n@III\n@r2\nAC\nGT\n+r2\nII\nII\n\n@r3\nTT\n+\n##\n'
+    path = tmp_path / 'reads.fq'
+    path.write_text(text)
+    expected = [('r1 first', 'ACGT', '@III'), ('r2', 'ACGT', 'IIII'), ('r3', 'TT', '##')]
+    assert list(read_fastq(str(path))) == expected
+
+    gz = tmp_path / 'reads.fq.gz'
+    with gzip.open(str(gz), 'wt') as f:
+        f.write(text)
+    assert list(read_fastq(str(gz))) == expected
+
+
+def test_fasta_file(tmp_path):
+    path = tmp_path / 'genome.fa'
+    path.write_text('>a first\nACGT\nAC\n>empty\n>b\nAC\nGTA\nC\n>c\nACG\nTTT\nA')
+    fasta = FastaFile(str(path), save_fai=True)
+    assert fasta.names == ['a first', 'empty', 'b', 'c']
+    assert [r.name for r in fasta.fai] == ['a', 'empty', 'b', 'c']
+    assert fasta.lengths == [6, 0, 6, 7]
+    assert list(fasta.records()) == [['a first', 'ACGTAC'], ['empty', ''], ['b', 'ACGTAC'], ['c', 'ACGTTTA']]
+    seqs = dict(fasta.records())
+    for name in ['a first', 'b', 'c']:
+        for start in range(8):
+            for end in range(start, 9):
+                assert fasta.fetch(name, start, end) == seqs[name][start:end].encode()
+    assert fasta.fetch('a', 1, 3) == b'CG'
+    assert not (tmp_path / 'genome.fa.fai').exists()  # b has uneven lines.
+
+
+def test_fai_round_trip(tmp_path):
+    path = tmp_path / 'genome.fa'
+    path.write_text('>chr1\nACGTA\nCCGTT\nA\n>chr2 two\nGGG\n')
+    assert FastaFile(str(path)).names == ['chr1', 'chr2 two']
+    assert not (tmp_path / 'genome.fa.fai').exists()  # only written when asked for.
+    first = FastaFile(str(path), save_fai=True)
+    assert (tmp_path / 'genome.fa.fai').read_text() == 'chr1\t11\t6\t5\t6\nchr2\t3\t30\t3\t4\n'
+    second = FastaFile(str(path))  # from the .fai
+    assert second.fai == first.fai and second.names == ['chr1', 'chr2 two']
+    assert second.sequence('chr2') == b'GGG' and second.fetch(0, 4, 11) == b'ACCGTTA'
+
+
+def test_stale_fai(tmp_path):
+    path = tmp_path / 'genome.fa'
+    path.write_text('>chr1\nACGTA\nCC\n>chr2\nGGG\n')
+    FastaFile(str(path), save_fai=True)
+    old = tmp_path / 'old.fa'
+    old.write_text('>chr1\nACGTA\nCCGTT\nA\n>chr2 two\nGGG\n>chr3\nT\n')
+    os.utime(str(old), (0, 0))
+    os.replace(str(old), str(path))  # an older file in place of the indexed one.
+    fasta = FastaFile(str(path))
+    assert fasta.names == ['chr1', 'chr2 two', 'chr3']
+    assert list(fasta.records()) == [['chr1', 'ACGTACCGTTA'], ['chr2 two', 'GGG'], ['chr3', 'T']]
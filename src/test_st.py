@@ -0,0 +1,68 @@
+import random
+
+from st import SuffixTree, SuffixTreeMcCreight, bf_order, match_seq, match_locus, iter_leaves, leaf_intervals
+from SEQsimulator import simulate_string
+
+
+def leaf_set(tree):
+    return {(t[0], t[1], t[2]) for t in bf_order(tree) if t[2] != None}
+
+
+def shape(node, string):
+    # tree as nested (edge label, leaf, children) with edges in sorted order.
+    label = '' if node.start is None else string[node.start:node.end]
+    children = tuple(shape(node.out[c], string) for c in sorted(node.out))
+    return (label, node.suffix_order_leaf, children)
+
+
+def test_mccreight_same_leaves_as_naive():
+    random.seed(1984)
+    for _ in range(200):
+        ref = simulate_string(random.randint(1, 80))
+        naive = SuffixTree(ref)
+        linear = SuffixTreeMcCreight(ref)
+        assert leaf_set(naive) == leaf_set(linear)
+        assert shape(naive, ref + '$') == shape(linear, ref + '$')
+
+
+def test_mccreight_repetitive():
+    for ref in ['a' * 50, 'ab' * 25, 'mississippi', 'abaaba', 'aab' * 10]:
+        string = ref + '$'
+        assert shape(SuffixTree(ref), string) == shape(SuffixTreeMcCreight(ref), string)
+
+
+def test_mccreight_match_seq():
+    ref = 'mississippi'
+    tree = SuffixTreeMcCreight(ref)
+    subtree = match_seq(tree, ref, 'ss')
+    assert sorted(t[2] for t in bf_order(subtree) if t[2] != None) == [2, 5]
+
+
+def test_leaf_intervals():
+    random.seed(5)
+    for _ in range(50):
+        ref = simulate_string(random.randint(1, 60))
+        tree = SuffixTreeMcCreight(ref)
+        leaf_array = leaf_intervals(tree)
+        assert sorted(leaf_array) == list(range(len(ref) + 1))
+        for read in [ref[i:i+3] for i in range(0, len(ref), 5)]:
+            node = match_seq(tree, ref, read)
+            expected = sorted(t[2] for t in bf_order(node) if t[2] != None)
+            assert sorted(leaf_array[node.leaf_lo:node.leaf_hi]) == expected
+            assert sorted(iter_leaves(node)) == expected
+
+
+def test_match_locus_agrees_with_match_seq():
+    random.seed(9)
+    for _ in range(50):
+        ref = simulate_string(random.randint(1, 60))
+        tree = SuffixTree(ref)
+        for _ in range(10):
+            read = simulate_string(random.randint(1, 6))
+            node, depth = match_locus(tree, ref, read)
+            longest = max(k for k in range(len(read) + 1) if read[:k] in ref)
+            assert depth == longest
+            if depth == len(read):
+                assert node is match_seq(tree, ref, read)
+            else:
+                assert match_seq(tree, ref, read) is None
@@ -0,0 +1,54 @@
+import io
+import json
+import os
+
+from stats import RunStats, count_nodes
+from st import build_index, read_fasta, main, BACKENDS
+from mapper import map_reads
+from generalized import GeneralizedIndex
+from seqio import read_fastq
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_count_nodes():
+    counts = {backend: count_nodes(build_index('mississippi', backend, 'mccreight')) for backend in BACKENDS}
+    assert counts['tree'] == counts['compact'] > len('mississippi$')
+    assert counts['sa'] is None
+
+
+def test_run_stats():
+    stats = RunStats()
+    with stats.stage('map'):
+        stats.counts['reads'] = 10
+    stats.map_stages.update(search=0.5, report=0.25)
+    report = stats.report()
+    assert set(report['stages']) == {'map'}
+    assert report['reads_per_second'] > 0
+    assert report['total_seconds'] >= report['stages']['map']
+    assert report['map_stages'] == {'search': 0.5, 'report': 0.25}
+    assert set(report['stage_rates']) == {'map', 'search', 'report'}
+    assert report['stage_rates']['search'] == {'reads_per_second': 20.0}
+
+
+def test_map_reads_counts():
+    genome = GeneralizedIndex.build(read_fasta(os.path.join(HERE, 'data_for_testing', 'mississippi.fa')), build_index)
+    reads = list(read_fastq(os.path.join(HERE, 'data_for_testing', 'mississippi.fq')))
+    for threads in [1, 2]:
+        timings = {}
+        assert map_reads(genome, reads, io.StringIO(), threads=threads, chunk_size=1, timings=timings) == (4, 18)
+        assert set(timings) == {'search', 'report', 'write'}
+    timings = {}
+    map_reads(genome, reads, io.StringIO(), count_only=True, timings=timings)
+    assert set(timings) == {'search', 'report', 'write'}
+
+
+def test_stats_option(tmp_path, capsys):
+    path = str(tmp_path / 'stats.json')
+    main(['--stats', path, os.path.join(HERE, 'data_for_testing', 'mississippi.fa'),
+          os.path.join(HERE, 'data_for_testing', 'mississippi.fq')])
+    report = json.load(open(path))
+    assert set(report['stages']) == {'read_fasta', 'build', 'map'}
+    assert set(report['map_stages']) == {'search', 'report', 'write'}
+    assert (report['reads'], report['hits']) == (4, 18)
+    assert len(capsys.readouterr().out.splitlines()) == 18